@@ -1,15 +1,86 @@
 import os
+import re
 import subprocess
+import hashlib
+import json
+import mmap
+import sqlite3
 from pathlib import Path
 from datetime import datetime, timezone
 import shutil
 import argparse
+import sys
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+from dataclasses import dataclass, field
 import tree_sitter
 import tree_sitter_rust
 
 language = tree_sitter.Language(tree_sitter_rust.language())
 parser = tree_sitter.Parser(language)
 
+KNOWLEDGE_DB = "knowledge.db"
+MANIFEST_DIR = "manifests"
+PAGE_CACHE_MB = 32
+CALL_BLACKLIST = frozenset(['if', 'while', 'for', 'match', 'Some', 'Ok', 'Err', 'String', 'Vec', 'Box', 'format!', 'println!', 'tracing::info!', 'tracing::debug!', 'tracing::error!', 'tracing::warn!', 'panic!'])
+
+intern = sys.intern
+
+
+# Slotted records keep extracted ASTs compact when many files stay resident;
+# identifiers, types and visibility markers are interned so repeats share storage.
+@dataclass(slots=True)
+class ClassInfo:
+    type: str
+    line: int
+    fields: list = field(default_factory=list)
+    raw_fields: list = field(default_factory=list)
+    methods: list = field(default_factory=list)
+    doc: str = ""
+
+
+@dataclass(slots=True)
+class MethodInfo:
+    name: str
+    struct: str
+    line: int
+    calls: tuple
+    params: tuple
+    ret_type: str
+    is_pub: str
+    doc: str = ""
+
+
+class SourceText:
+    # memoryview over the (memory-mapped) source. Spans are decoded straight from
+    # the mapping without materializing the file as bytes, and callers decode each
+    # span once: comment markers are checked on raw bytes and parameters come
+    # from the grammar rather than re-splitting decoded text.
+    __slots__ = ("view",)
+
+    def __init__(self, buffer):
+        self.view = memoryview(buffer)
+
+    def span(self, start, end):
+        return str(self.view[start:end], "utf-8")
+
+    def startswith(self, node, prefix):
+        start = node.start_byte
+        return node.end_byte - start >= len(prefix) and self.view[start:start + len(prefix)] == prefix
+
+    def release(self):
+        self.view.release()
+
+
+@dataclass(slots=True)
+class RustFileAst:
+    classes: dict
+    methods: list
+    dependencies: list
+    relations: list
+
 
 def get_git_commit():
     try:
@@ -17,7 +88,7 @@ def get_git_commit():
     except Exception:
         return "unknown"
 
-def mirror_directory(src_dir, target_dir):
+def mirror_directory(src_dir, target_dir, create=True):
     src_path = Path(src_dir)
     target_path = Path(target_dir) / "modules"
     if not src_path.exists():
@@ -43,7 +114,8 @@ def mirror_directory(src_dir, target_dir):
             rel_path = current_root.relative_to(src_path)
             current_target = target_path / src_path.name / rel_path
 
-        current_target.mkdir(parents=True, exist_ok=True)
+        if create:
+            current_target.mkdir(parents=True, exist_ok=True)
         for file in files:
             if file.endswith('.rs'):
                 source_file = current_root / file
@@ -54,17 +126,36 @@ def mirror_directory(src_dir, target_dir):
 
 def parse_rust_file(filepath):
     with open(filepath, "rb") as f:
-        source_code = f.read()
+        try:
+            source_code = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            source_code = b""
+    source = SourceText(source_code)
+    try:
+        return _parse_rust_source(filepath, source_code, source)
+    finally:
+        source.release()
+        if isinstance(source_code, mmap.mmap):
+            source_code.close()
 
+def _parse_rust_source(filepath, source_code, source):
     tree = parser.parse(source_code)
 
     classes = {}
     methods = []
     dependencies = []
     relations = []
+    # Parameter lists repeat across a file's methods (&self, id: u64, ...). The
+    # table lives only for this parse, so a long-running server does not keep
+    # every parameter list it has ever seen.
+    interned_params = {}
 
     def get_text(node):
-        return source_code[node.start_byte:node.end_byte].decode("utf-8")
+        return source.span(node.start_byte, node.end_byte)
+
+    def get_name(node):
+        return intern(source.span(node.start_byte, node.end_byte))
 
     def get_node_doc(node):
         docs = []
@@ -72,34 +163,63 @@ def parse_rust_file(filepath):
         while curr:
             if curr.type == "attribute_item":
                 pass
-            elif curr.type == "line_comment" and get_text(curr).startswith("///"):
-                docs.insert(0, get_text(curr)[3:].strip())
+            elif curr.type == "line_comment" and source.startswith(curr, b"///"):
+                docs.append(source.span(curr.start_byte + 3, curr.end_byte).strip())
             else:
                 break
             curr = curr.prev_sibling
+        docs.reverse()
         return "\n".join(docs)
 
+    def get_params(params_node):
+        # (name, type) pairs straight from the grammar; type is None for self receivers
+        params = []
+        for p in params_node.named_children:
+            if p.type == "parameter":
+                params.append((get_text(p.child_by_field_name("pattern")), get_text(p.child_by_field_name("type"))))
+            elif p.type not in ("attribute_item", "line_comment", "block_comment"):
+                params.append((get_text(p), None))
+        params = tuple(params)
+        return interned_params.setdefault(params, params)
+
+    def extract_calls(node):
+        calls = []
+        def visit(n):
+            if n.type == "call_expression":
+                func_node = n.child_by_field_name("function")
+                if func_node:
+                    if func_node.type == "field_expression":
+                        cname = get_name(func_node.child_by_field_name("field"))
+                    else:
+                        cname = get_name(func_node)
+                    if cname not in CALL_BLACKLIST:
+                        calls.append(cname)
+            for c in n.children:
+                visit(c)
+        visit(node)
+        return tuple(calls)
+
     def walk_file(node):
         if node.type == "use_declaration":
             dependencies.append(get_text(node))
         elif node.type == "struct_item":
             struct_name_node = node.child_by_field_name("name")
             if struct_name_node:
-                struct_name = get_text(struct_name_node)
+                struct_name = get_name(struct_name_node)
                 fields = []
                 raw_fields = []
                 body = node.child_by_field_name("body")
                 if body and body.type == "field_declaration_list":
                     for field in body.children:
                         if field.type == "field_declaration":
-                            fname = get_text(field.child_by_field_name("name"))
-                            ftype = get_text(field.child_by_field_name("type"))
+                            fname = get_name(field.child_by_field_name("name"))
+                            ftype = get_name(field.child_by_field_name("type"))
                             visibility = "-"
                             for c in field.children:
                                 if c.type == "visibility_modifier":
                                     visibility = "+"
                                     break
-                            fields.append(f"{visibility}{ftype} {fname}")
+                            fields.append(intern(f"{visibility}{ftype} {fname}"))
                             raw_fields.append((fname, ftype))
 
                             rel_type = ''.join(c for c in ftype.split('<')[0] if c.isalnum() or c == '_')
@@ -111,8 +231,8 @@ def parse_rust_file(filepath):
                          if field.type == "visibility_modifier":
                              visibility = "+"
                          elif field.type not in (",", "(", ")"):
-                             ftype = get_text(field)
-                             fields.append(f"{visibility}{ftype}")
+                             ftype = get_name(field)
+                             fields.append(intern(f"{visibility}{ftype}"))
                              raw_fields.append(("", ftype))
 
                              rel_type = ''.join(c for c in ftype.split('<')[0] if c.isalnum() or c == '_')
@@ -121,25 +241,24 @@ def parse_rust_file(filepath):
                              visibility = "-"
 
 
-                classes[struct_name] = {
-                    "type": "class",
-                    "fields": fields,
-                    "raw_fields": raw_fields,
-                    "methods": [],
-                    "line": node.start_point[0] + 1,
-                    "doc": get_node_doc(node)
-                }
+                classes[struct_name] = ClassInfo(
+                    type="class",
+                    line=node.start_point[0] + 1,
+                    fields=fields,
+                    raw_fields=raw_fields,
+                    doc=get_node_doc(node),
+                )
         elif node.type == "enum_item":
             enum_name_node = node.child_by_field_name("name")
             if enum_name_node:
-                enum_name = get_text(enum_name_node)
+                enum_name = get_name(enum_name_node)
                 fields = []
                 raw_fields = []
                 body = node.child_by_field_name("body")
                 if body and body.type == "enum_variant_list":
                     for variant in body.children:
                         if variant.type == "enum_variant":
-                            vname = get_text(variant.child_by_field_name("name"))
+                            vname = get_name(variant.child_by_field_name("name"))
                             variant_types = []
                             vbody = variant.child_by_field_name("body")
                             if vbody:
@@ -160,61 +279,58 @@ def parse_rust_file(filepath):
                                 type_str = "variant"
 
                             fields.append(vname)
-                            raw_fields.append((vname, type_str))
-                classes[enum_name] = {
-                    "type": "<<enumeration>>",
-                    "fields": fields,
-                    "raw_fields": raw_fields,
-                    "methods": [],
-                    "line": node.start_point[0] + 1,
-                    "doc": get_node_doc(node)
-                }
+                            raw_fields.append((vname, intern(type_str)))
+                classes[enum_name] = ClassInfo(
+                    type="<<enumeration>>",
+                    line=node.start_point[0] + 1,
+                    fields=fields,
+                    raw_fields=raw_fields,
+                    doc=get_node_doc(node),
+                )
         elif node.type == "trait_item":
             trait_name_node = node.child_by_field_name("name")
             if trait_name_node:
-                trait_name = get_text(trait_name_node)
+                trait_name = get_name(trait_name_node)
                 trait_methods = []
                 body = node.child_by_field_name("body")
                 if body and body.type == "declaration_list":
                     for child in body.children:
                         if child.type in ("function_item", "function_signature_item"):
-                            fname = get_text(child.child_by_field_name("name"))
-                            trait_methods.append(f"+{fname}()")
+                            fname = get_name(child.child_by_field_name("name"))
+                            trait_methods.append(intern(f"+{fname}()"))
 
-                            params_str = ""
+                            params = ()
                             params_node = child.child_by_field_name("parameters")
                             if params_node:
-                                params_str = get_text(params_node)[1:-1]
+                                params = get_params(params_node)
 
                             ret_type_str = "()"
                             ret_type_node = child.child_by_field_name("return_type")
                             if ret_type_node:
-                                ret_type_str = get_text(ret_type_node)
-
-                            methods.append({
-                                "name": fname,
-                                "struct": trait_name,
-                                "line": child.start_point[0] + 1,
-                                "calls": [],
-                                "params": params_str,
-                                "ret_type": ret_type_str,
-                                "is_pub": "+",
-                                "doc": get_node_doc(child)
-                            })
-                classes[trait_name] = {
-                    "type": "<<interface>>",
-                    "fields": [],
-                    "raw_fields": [],
-                    "methods": trait_methods,
-                    "line": node.start_point[0] + 1,
-                    "doc": get_node_doc(node)
-                }
+                                ret_type_str = get_name(ret_type_node)
+
+                            methods.append(MethodInfo(
+                                name=fname,
+                                struct=trait_name,
+                                line=child.start_point[0] + 1,
+                                calls=(),
+                                params=params,
+                                ret_type=ret_type_str,
+                                is_pub="+",
+                                doc=get_node_doc(child),
+                            ))
+                classes[trait_name] = ClassInfo(
+                    type="<<interface>>",
+                    line=node.start_point[0] + 1,
+                    methods=trait_methods,
+                    doc=get_node_doc(node),
+                )
         elif node.type == "impl_item":
             type_node = node.child_by_field_name("type")
             trait_node = node.child_by_field_name("trait")
 
             if type_node:
-                struct_name = get_text(type_node)
+                struct_name = get_name(type_node)
                 if trait_node:
                     trait_name = get_text(trait_node)
                     clean_trait = trait_name.split('::')[-1]
@@ -224,108 +340,72 @@ def parse_rust_file(filepath):
                 if body:
                     for child in body.children:
                         if child.type in ("function_item", "function_signature_item"):
-                            fname = get_text(child.child_by_field_name("name"))
+                            fname = get_name(child.child_by_field_name("name"))
                             visibility = "-"
                             for c in child.children:
                                 if c.type == "visibility_modifier":
                                     visibility = "+"
                                     break
-                            method_sig = f"{visibility}{fname}()"
+                            method_sig = intern(f"{visibility}{fname}()")
 
-                            params_str = ""
+                            params = ()
                             params_node = child.child_by_field_name("parameters")
                             if params_node:
-                                params_str = get_text(params_node)[1:-1]
+                                params = get_params(params_node)
 
                             ret_type_str = "()"
                             ret_type_node = child.child_by_field_name("return_type")
                             if ret_type_node:
-                                ret_type_str = get_text(ret_type_node)
-
-                            calls = []
-                            def extract_calls(n):
-                                if n.type == "call_expression":
-                                    func_node = n.child_by_field_name("function")
-                                    if func_node:
-                                        if func_node.type == "field_expression":
-                                            cname = get_text(func_node.child_by_field_name("field"))
-                                        elif func_node.type == "identifier":
-                                            cname = get_text(func_node)
-                                        else:
-                                            cname = get_text(func_node)
-                                        if cname not in ['if', 'while', 'for', 'match', 'Some', 'Ok', 'Err', 'String', 'Vec', 'Box', 'format!', 'println!', 'tracing::info!', 'tracing::debug!', 'tracing::error!', 'tracing::warn!', 'panic!']:
-                                            calls.append(cname)
-                                for c in n.children:
-                                    extract_calls(c)
-                            extract_calls(child)
-
-                            methods.append({
-                                "name": fname,
-                                "struct": struct_name,
-                                "line": child.start_point[0] + 1,
-                                "calls": calls,
-                                "params": params_str,
-                                "ret_type": ret_type_str,
-                                "is_pub": visibility,
-                                "doc": get_node_doc(child)
-                            })
+                                ret_type_str = get_name(ret_type_node)
+
+                            methods.append(MethodInfo(
+                                name=fname,
+                                struct=struct_name,
+                                line=child.start_point[0] + 1,
+                                calls=extract_calls(child),
+                                params=params,
+                                ret_type=ret_type_str,
+                                is_pub=visibility,
+                                doc=get_node_doc(child),
+                            ))
 
                             if struct_name in classes:
-                                classes[struct_name]["methods"].append(method_sig)
+                                classes[struct_name].methods.append(method_sig)
                             else:
-                                classes[struct_name] = {
-                                    "type": "class",
-                                    "fields": [],
-                                    "raw_fields": [],
-                                    "methods": [method_sig],
-                                    "line": node.start_point[0] + 1,
-                                    "doc": get_node_doc(node)
-                                }
+                                classes[struct_name] = ClassInfo(
+                                    type="class",
+                                    line=node.start_point[0] + 1,
+                                    methods=[method_sig],
+                                    doc=get_node_doc(node),
+                                )
         elif node.type == "function_item" and node.parent.type == "source_file":
-            fname = get_text(node.child_by_field_name("name"))
+            fname = get_name(node.child_by_field_name("name"))
             visibility = "-"
             for c in node.children:
                 if c.type == "visibility_modifier":
                     visibility = "+"
                     break
 
-            params_str = ""
+            params = ()
             params_node = node.child_by_field_name("parameters")
             if params_node:
-                params_str = get_text(params_node)[1:-1]
+                params = get_params(params_node)
 
             ret_type_str = "()"
             ret_type_node = node.child_by_field_name("return_type")
             if ret_type_node:
-                ret_type_str = get_text(ret_type_node)
-
-            calls = []
-            def extract_calls(n):
-                if n.type == "call_expression":
-                    func_node = n.child_by_field_name("function")
-                    if func_node:
-                        if func_node.type == "field_expression":
-                            cname = get_text(func_node.child_by_field_name("field"))
-                        elif func_node.type == "identifier":
-                            cname = get_text(func_node)
-                        else:
-                            cname = get_text(func_node)
-                        if cname not in ['if', 'while', 'for', 'match', 'Some', 'Ok', 'Err', 'String', 'Vec', 'Box', 'format!', 'println!', 'tracing::info!', 'tracing::debug!', 'tracing::error!', 'tracing::warn!', 'panic!']:
-                            calls.append(cname)
-                for c in n.children:
-                    extract_calls(c)
-            extract_calls(node)
-
-            methods.append({
-                "name": fname,
-                "struct": None,
-                "line": node.start_point[0] + 1,
-                "calls": calls,
-                "params": params_str,
-                "ret_type": ret_type_str,
-                "is_pub": visibility,
-                "doc": get_node_doc(node)
-            })
+                ret_type_str = get_name(ret_type_node)
+
+            methods.append(MethodInfo(
+                name=fname,
+                struct=None,
+                line=node.start_point[0] + 1,
+                calls=extract_calls(node),
+                params=params,
+                ret_type=ret_type_str,
+                is_pub=visibility,
+                doc=get_node_doc(node),
+            ))
 
         for child in node.children:
             if node.type not in ["impl_item", "struct_item", "enum_item", "trait_item", "use_declaration"]:
@@ -342,47 +422,47 @@ def parse_rust_file(filepath):
 
         mod_methods = []
         for m in methods:
-            if m["struct"] is None:
-                mod_methods.append(f"+{m['name']}()")
-        classes[mod_name] = {"type": "<<module>>", "fields": [], "raw_fields": [], "methods": mod_methods, "line": 1}
+            if m.struct is None:
+                mod_methods.append(intern(f"+{m.name}()"))
+        classes[intern(mod_name)] = ClassInfo(type="<<module>>", line=1, methods=mod_methods)
 
-    return {
-        "classes": classes,
-        "methods": methods,
-        "dependencies": sorted(list(set(dependencies))),
-        "relations": sorted(list(set(relations)))
-    }
+    return RustFileAst(
+        classes=classes,
+        methods=methods,
+        dependencies=sorted(set(dependencies)),
+        relations=sorted(set(relations)),
+    )
 
 def generate_plantuml_class_diagram(ast):
     plantuml = "```plantuml\n@startuml\n"
-    for name, data in ast["classes"].items():
+    for name, data in ast.classes.items():
         plantuml += f"    class {name} {{\n"
-        if data["type"] != "class":
-            plantuml += f"        {data['type']}\n"
-        for f in data["fields"]:
+        if data.type != "class":
+            plantuml += f"        {data.type}\n"
+        for f in data.fields:
             plantuml += f"        {f}\n"
-        for m in data["methods"]:
+        for m in data.methods:
             plantuml += f"        {m}\n"
         plantuml += "    }\n"
-    for rel in ast["relations"]:
+    for rel in ast.relations:
         plantuml += f"    {rel}\n"
-    if not ast["classes"]:
+    if not ast.classes:
         plantuml += "    class Module {\n        <<module>>\n    }\n"
     plantuml += "@enduml\n```\n"
     return plantuml
 
 def generate_plantuml_sequence_diagram(ast):
     plantuml = "```plantuml\n@startuml\n    autonumber\n    participant \"Client Interface\" as Caller\n"
-    if not ast["methods"]:
+    if not ast.methods:
         return plantuml + "    Caller->Svc: Invoke\n@enduml\n```\n"
 
-    main_actor = list(ast["classes"].keys())[0] if ast["classes"] else "Svc"
+    main_actor = list(ast.classes.keys())[0] if ast.classes else "Svc"
     plantuml += f"    participant {main_actor} as Svc\n"
 
-    for m in ast["methods"][:5]:  # limit to top 5 methods for clarity
-        actor = m["struct"] if m["struct"] else main_actor
-        plantuml += f"    Caller->Svc: {m['name']}()\n"
-        for call in m.get("calls", [])[:3]: # limit inner calls
+    for m in ast.methods[:5]:  # limit to top 5 methods for clarity
+        actor = m.struct if m.struct else main_actor
+        plantuml += f"    Caller->Svc: {m.name}()\n"
+        for call in m.calls[:3]: # limit inner calls
              plantuml += f"    Svc->Svc: {call}()\n"
         plantuml += f"    Svc-->Caller: Returns execution status\n"
 
@@ -398,30 +478,30 @@ def generate_okf_markdown(filepath, rel_dir, ast, commit_hash):
     class_diagram = generate_plantuml_class_diagram(ast)
     seq_diagram = generate_plantuml_sequence_diagram(ast)
 
-    deps_list = "\n".join([f"- `{dep}`" for dep in ast["dependencies"]]) if ast["dependencies"] else "- None"
+    deps_list = "\n".join([f"- `{dep}`" for dep in ast.dependencies]) if ast.dependencies else "- None"
 
     citations = ""
-    for name, data in ast["classes"].items():
-         citations += f"* Class `{name}`: `{filepath.as_posix()}:L{data['line']}`\n"
-    for m in ast["methods"]:
-         cls_str = f" in `{m['struct']}`" if m['struct'] else ""
-         citations += f"* Method `{m['name']}`{cls_str}: `{filepath.as_posix()}:L{m['line']}`\n"
+    for name, data in ast.classes.items():
+         citations += f"* Class `{name}`: `{filepath.as_posix()}:L{data.line}`\n"
+    for m in ast.methods:
+         cls_str = f" in `{m.struct}`" if m.struct else ""
+         citations += f"* Method `{m.name}`{cls_str}: `{filepath.as_posix()}:L{m.line}`\n"
     if not citations:
          citations = "* No direct classes or functions extracted."
 
     # Data Structures & Properties
     data_structs = "## 3. Data Structures, Structs & Class Properties\n\n"
     has_structs = False
-    for name, data in ast["classes"].items():
+    for name, data in ast.classes.items():
         has_structs = True
         data_structs += f"### {name}\n"
-        if data.get("doc"):
-            data_structs += f"**Overview:** {data['doc']}\n\n"
+        if data.doc:
+            data_structs += f"**Overview:** {data.doc}\n\n"
 
-        if data.get("raw_fields"):
+        if data.raw_fields:
             data_structs += "| Property | Type | Description |\n"
             data_structs += "| :--- | :--- | :--- |\n"
-            for fname, ftype in data["raw_fields"]:
+            for fname, ftype in data.raw_fields:
                 if not fname: fname = "N/A"
                 data_structs += f"| `{fname}` | `{ftype}` | Field of {name} |\n"
             data_structs += "\n"
@@ -431,30 +511,26 @@ def generate_okf_markdown(filepath, rel_dir, ast, commit_hash):
     # Methods & Functions Breakdown
     method_breakdown = "## 4. Comprehensive Methods & Functions Breakdown\n\n"
     has_methods = False
-    for m in ast["methods"]:
+    for m in ast.methods:
         has_methods = True
-        cls_str = f"{m['struct']}::" if m['struct'] else ""
-        method_breakdown += f"### `{cls_str}{m['name']}`\n"
-        method_breakdown += f"* **Visibility:** {m['is_pub']}\n"
-        method_breakdown += f"* **Source Line Citation:** `{filepath.as_posix()}:L{m['line']}`\n\n"
+        cls_str = f"{m.struct}::" if m.struct else ""
+        method_breakdown += f"### `{cls_str}{m.name}`\n"
+        method_breakdown += f"* **Visibility:** {m.is_pub}\n"
+        method_breakdown += f"* **Source Line Citation:** `{filepath.as_posix()}:L{m.line}`\n\n"
 
-        if m.get("doc"):
-            method_breakdown += f"**Description:** {m['doc']}\n\n"
+        if m.doc:
+            method_breakdown += f"**Description:** {m.doc}\n\n"
 
         # Parameters
         method_breakdown += "#### Input Parameters\n"
         method_breakdown += "| Parameter | Data Type | Required / Default | Semantic Description |\n"
         method_breakdown += "| :--- | :--- | :--- | :--- |\n"
-        if m["params"]:
-            for param in m["params"].split(','):
-                param = param.strip()
-                if param:
-                    parts = param.split(':')
-                    if len(parts) == 2:
-                        pname, ptype = parts[0].strip(), parts[1].strip()
-                        method_breakdown += f"| `{pname}` | `{ptype}` | Required | Parameter |\n"
-                    else:
-                        method_breakdown += f"| `{param}` | `self` | Required | Instance reference |\n"
+        if m.params:
+            for pname, ptype in m.params:
+                if ptype is not None:
+                    method_breakdown += f"| `{pname}` | `{ptype}` | Required | Parameter |\n"
+                else:
+                    method_breakdown += f"| `{pname}` | `self` | Required | Instance reference |\n"
         else:
             method_breakdown += "| None | None | N/A | No parameters |\n"
         method_breakdown += "\n"
@@ -463,7 +539,7 @@ def generate_okf_markdown(filepath, rel_dir, ast, commit_hash):
         method_breakdown += "#### Return Value & Output Shape\n"
         method_breakdown += "| Return Type | Scenario | Description |\n"
         method_breakdown += "| :--- | :--- | :--- |\n"
-        method_breakdown += f"| `{m['ret_type']}` | Success | Result of the operation |\n\n"
+        method_breakdown += f"| `{m.ret_type}` | Success | Result of the operation |\n\n"
 
     if not has_methods:
         method_breakdown += "No methods or functions defined in this module.\n\n"
@@ -646,12 +722,24 @@ Placeholder for guide.
         (Path(target_dir) / d).mkdir(parents=True, exist_ok=True)
 
 
+def build_manifest_entry(src, dst, target_dir, ast):
+    # Compact per-file symbol summary: everything the index, SUMMARY and logs need
+    return {
+        "src": src.as_posix(),
+        "doc": dst.relative_to(target_dir).as_posix(),
+        "classes": [[name, info.type] for name, info in ast.classes.items()],
+        "api": [[m.name, m.struct] for m in ast.methods if m.is_pub == "+"],
+    }
+
 def generate_index_and_logs(target_dir, files_processed, commit_hash):
-    index_path = Path(target_dir) / "index.md"
-    logs_path = Path(target_dir) / "logs.md"
-    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    entries = [build_manifest_entry(src, dst, target_dir, parse_rust_file(src)) for src, dst, _ in files_processed]
+    write_index_and_logs(target_dir, entries, commit_hash)
+
+def sort_manifest_entries(entries):
+    # Sorting on path components matches the previous Path-based ordering
+    return sorted(entries, key=lambda e: tuple(e["doc"].split("/")))
 
-    # Generate Index
+def render_index(entries, timestamp):
     index_content = f"""---
 iso_doc_type: "Description"
 iso_viewpoint: "ContextView"
@@ -673,54 +761,57 @@ timestamp: "{timestamp}"
 ## Modules
 
 """
-    for src, dst, _ in sorted(files_processed, key=lambda x: x[1]):
-        rel_dst = dst.relative_to(target_dir)
-        index_content += f"- [{src.name}](./{rel_dst.as_posix()}) (Source: `{src.as_posix()}`)\n"
+    for entry in entries:
+        src_name = entry["src"].rsplit("/", 1)[-1]
+        index_content += f"- [{src_name}](./{entry['doc']}) (Source: `{entry['src']}`)\n"
+    return index_content
 
-    with open(index_path, 'w', encoding='utf-8') as f:
-        f.write(index_content)
-
-    # Generate SUMMARY.md
-    summary_path = Path(target_dir) / "SUMMARY.md"
+def render_summary(entries):
     summary_content = "# SUMMARY\n\n## Navigation\n\n## Table of contents\n\n## Architecture overview\n\n## Module list\n"
-    for src, dst, _ in sorted(files_processed, key=lambda x: x[1]):
-        rel_dst = dst.relative_to(target_dir)
-        summary_content += f"- [{src.name}](./{rel_dst.as_posix()})\n"
+    for entry in entries:
+        src_name = entry["src"].rsplit("/", 1)[-1]
+        summary_content += f"- [{src_name}](./{entry['doc']})\n"
     summary_content += "\n## Alphabetical class index\n\n"
 
-    # Collect classes and methods from all ASTs to generate indexes
+    # Entries carry a precomputed lowercase key so the sorts compare plain tuples
     all_classes = []
     all_methods = []
-    for src, dst, _ in files_processed:
-        ast_data = parse_rust_file(src)
-        rel_dst = dst.relative_to(target_dir)
-        link = f"./{rel_dst.as_posix()}"
+    for entry in entries:
+        link = f"./{entry['doc']}"
 
-        for class_name, class_info in ast_data["classes"].items():
-            all_classes.append((class_name, class_info["type"], link))
+        for class_name, class_type in entry["classes"]:
+            all_classes.append((class_name.lower(), class_name, class_type, link))
 
-        for method_info in ast_data["methods"]:
-            if method_info["is_pub"] == "+":
-                all_methods.append((method_info["name"], method_info["struct"], link))
+        for method_name, struct_name in entry["api"]:
+            all_methods.append((method_name.lower(), method_name, struct_name or "", link))
 
-    all_classes.sort(key=lambda x: x[0].lower())
-    for class_name, type_str, link in all_classes:
+    all_classes.sort()
+    for _, class_name, type_str, link in all_classes:
         clean_type = type_str.replace("<<", "").replace(">>", "")
         if clean_type == "class":
             clean_type = "struct"
         summary_content += f"- [{class_name} ({clean_type})]({link})\n"
 
     summary_content += "\n## Public API index\n\n"
-    all_methods.sort(key=lambda x: x[0].lower())
-    for method_name, struct_name, link in all_methods:
+    all_methods.sort()
+    for _, method_name, struct_name, link in all_methods:
         if struct_name:
             display_name = f"{struct_name}::{method_name}"
         else:
             display_name = method_name
         summary_content += f"- [{display_name}]({link})\n"
+    return summary_content
+
+def write_index_and_logs(target_dir, entries, commit_hash):
+    entries = sort_manifest_entries(entries)
+    logs_path = Path(target_dir) / "logs.md"
+    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    with open(Path(target_dir) / "index.md", 'w', encoding='utf-8') as f:
+        f.write(render_index(entries, timestamp))
 
-    with open(summary_path, 'w', encoding='utf-8') as f:
-        f.write(summary_content)
+    with open(Path(target_dir) / "SUMMARY.md", 'w', encoding='utf-8') as f:
+        f.write(render_summary(entries))
 
     # Generate/Append Changelog
 
@@ -736,27 +827,435 @@ timestamp: "{timestamp}"
 
 ## Update: {timestamp}
 
-- Synchronized `{len(files_processed)}` files from source code to OpenWiki structure.
+- Synchronized `{len(entries)}` files from source code to OpenWiki structure.
 - Commit hash: `{commit_hash}`
 
 """
 
     if logs_path.exists():
         with open(logs_path, 'a', encoding='utf-8') as f:
-            f.write(f"\n## Update: {timestamp}\n- Synchronized `{len(files_processed)}` files.\n- Commit hash: `{commit_hash}`\n")
+            f.write(f"\n## Update: {timestamp}\n- Synchronized `{len(entries)}` files.\n- Commit hash: `{commit_hash}`\n")
     else:
         with open(logs_path, 'w', encoding='utf-8') as f:
             f.write("# OpenWiki Changelog\n\n" + log_entry)
 
+def open_knowledge_store(target_dir, name=KNOWLEDGE_DB):
+    conn = sqlite3.connect(Path(target_dir) / name)
+    conn.executescript("""
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    doc_path TEXT NOT NULL,
+    source_hash TEXT NOT NULL,
+    commit_hash TEXT,
+    indexed_at TEXT
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    parent TEXT,
+    signature TEXT,
+    line INTEGER,
+    doc TEXT
+);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS symbols_path ON symbols(path);
+CREATE VIRTUAL TABLE IF NOT EXISTS symbols_fts USING fts5(
+    name, parent, signature, doc, content='symbols', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS symbols_ai AFTER INSERT ON symbols BEGIN
+    INSERT INTO symbols_fts(rowid, name, parent, signature, doc)
+    VALUES (new.id, new.name, new.parent, new.signature, new.doc);
+END;
+CREATE TRIGGER IF NOT EXISTS symbols_ad AFTER DELETE ON symbols BEGIN
+    INSERT INTO symbols_fts(symbols_fts, rowid, name, parent, signature, doc)
+    VALUES ('delete', old.id, old.name, old.parent, old.signature, old.doc);
+END;
+""")
+    return conn
+
+def hash_source(filepath):
+    with open(filepath, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def is_indexed(conn, src, source_hash):
+    row = conn.execute("SELECT source_hash FROM files WHERE path = ?", (src.as_posix(),)).fetchone()
+    return row is not None and row[0] == source_hash
+
+def index_file_symbols(conn, src, dst, target_dir, ast, source_hash, commit_hash):
+    path = src.as_posix()
+    rows = []
+    title = src.name.split('.')[0].capitalize()
+    if title == "Mod":
+        title = src.parent.name.capitalize() + "Module"
+    rows.append(("module", title, None, "\n".join(ast.dependencies), 1, ""))
+    for name, data in ast.classes.items():
+        kind = data.type.replace("<<", "").replace(">>", "")
+        if kind == "class":
+            kind = "struct"
+        if kind != "module":
+            rows.append((kind, name, None, None, data.line, data.doc))
+        for fname, ftype in data.raw_fields:
+            rows.append(("field", fname or ftype, name, ftype, data.line, ""))
+    for m in ast.methods:
+        kind = "method" if m.struct else "function"
+        params = ", ".join(f"{pname}: {ptype}" if ptype else pname for pname, ptype in m.params)
+        signature = f"fn {m.name}({params}) -> {m.ret_type}"
+        rows.append((kind, m.name, m.struct, signature, m.line, m.doc))
+
+    with conn:
+        conn.execute("DELETE FROM symbols WHERE path = ?", (path,))
+        conn.executemany(
+            "INSERT INTO symbols (path, kind, name, parent, signature, line, doc) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(path,) + row for row in rows],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO files (path, doc_path, source_hash, commit_hash, indexed_at) VALUES (?, ?, ?, ?, ?)",
+            (path, dst.relative_to(target_dir).as_posix(), source_hash, commit_hash,
+             datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")),
+        )
+
+def prune_knowledge_store(conn, live_files):
+    live = {src.as_posix() for src, _, _ in live_files}
+    stale = [(path,) for (path,) in conn.execute("SELECT path FROM files") if path not in live]
+    with conn:
+        conn.executemany("DELETE FROM symbols WHERE path = ?", stale)
+        conn.executemany("DELETE FROM files WHERE path = ?", stale)
+    return len(stale)
+
+def fts_query(query):
+    # Symbol paths like AgentTeam::run or search-tool are FTS5 syntax errors as
+    # typed; quote every word as its own term (all must match), keeping a
+    # trailing * as a prefix search
+    terms = re.findall(r"\w+\*?", query)
+    return " ".join(f'"{term.rstrip("*")}"{"*" if term.endswith("*") else ""}' for term in terms)
+
+def search_knowledge_store(conn, query, limit=20):
+    match = fts_query(query)
+    if not match:
+        return []
+    return conn.execute(
+        "SELECT s.kind, s.name, s.parent, s.path, s.line, f.doc_path FROM symbols_fts "
+        "JOIN symbols s ON s.id = symbols_fts.rowid JOIN files f ON f.path = s.path "
+        "WHERE symbols_fts MATCH ? ORDER BY rank LIMIT ?",
+        (match, limit),
+    ).fetchall()
+
+def lookup_symbol(conn, name):
+    return conn.execute(
+        "SELECT s.kind, s.name, s.parent, s.path, s.line, f.doc_path FROM symbols s "
+        "JOIN files f ON f.path = s.path WHERE s.name = ? COLLATE NOCASE ORDER BY s.path, s.line",
+        (name,),
+    ).fetchall()
+
+def print_symbols(rows):
+    if not rows:
+        print("No matching symbols.")
+    for kind, name, parent, path, line, doc_path in rows:
+        qualified = f"{parent}::{name}" if parent else name
+        print(f"{kind:<12} {qualified:<40} {path}:L{line} -> {doc_path}")
+
+def parse_shard(value):
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid shard '{value}', expected i/N such as 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"invalid shard '{value}', need 0 <= i < N")
+    return index, count
+
+def shard_of(src, count):
+    # Stable across machines and Python runs, unlike hash()
+    digest = hashlib.sha1(src.as_posix().encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+def shard_name(index, count):
+    return f"shard-{index}-of-{count}"
+
+def write_shard_manifest(target_dir, index, count, entries, commit_hash):
+    manifest_dir = Path(target_dir) / MANIFEST_DIR
+    manifest_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = manifest_dir / f"{shard_name(index, count)}.json"
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({"shard": index, "shards": count, "commit": commit_hash, "files": entries}, f, separators=(",", ":"))
+    return manifest_path
+
+def clear_output_tree(target_dir, keep=(KNOWLEDGE_DB,)):
+    # Full mode starts from an empty tree except for the knowledge store, whose
+    # per-file source hashes let unchanged files skip re-indexing
+    target_path = Path(target_dir)
+    if not target_path.exists():
+        return
+    for child in target_path.iterdir():
+        if child.name in keep:
+            continue
+        if child.is_dir() and not child.is_symlink():
+            shutil.rmtree(child, ignore_errors=True)
+        else:
+            child.unlink(missing_ok=True)
+
+def clear_shard_outputs(target_dir, index, count):
+    # Shards may share one workspace, so a shard run only removes what its own
+    # previous run produced: the pages listed in its manifest, the manifest and its store
+    manifest_dir = Path(target_dir) / MANIFEST_DIR
+    manifest_path = manifest_dir / f"{shard_name(index, count)}.json"
+    if manifest_path.exists():
+        with open(manifest_path, encoding='utf-8') as f:
+            for entry in json.load(f)["files"]:
+                (Path(target_dir) / entry["doc"]).unlink(missing_ok=True)
+        manifest_path.unlink()
+    (manifest_dir / f"knowledge-{shard_name(index, count)}.db").unlink(missing_ok=True)
+
+def merge_shard_manifests(target_dir):
+    manifest_dir = Path(target_dir) / MANIFEST_DIR
+    manifests = []
+    for path in sorted(manifest_dir.glob("shard-*-of-*.json")):
+        with open(path, encoding='utf-8') as f:
+            manifests.append(json.load(f))
+    if not manifests:
+        raise SystemExit(f"No shard manifests found in {manifest_dir}")
+
+    counts = {m["shards"] for m in manifests}
+    if len(counts) != 1:
+        raise SystemExit(f"Shard manifests disagree on the shard count: {sorted(counts)}")
+    count = counts.pop()
+    missing = sorted(set(range(count)) - {m["shard"] for m in manifests})
+    if missing:
+        raise SystemExit(f"Missing manifests for shards {missing} of {count}")
+    commits = {m["commit"] for m in manifests}
+    if len(commits) != 1:
+        print(f"Warning: shards were generated from different commits: {sorted(commits)}")
+
+    entries = [entry for m in manifests for entry in m["files"]]
+    return entries, manifests[0]["commit"], count
+
+def merge_shard_knowledge_stores(target_dir, count):
+    (Path(target_dir) / KNOWLEDGE_DB).unlink(missing_ok=True)
+    conn = open_knowledge_store(target_dir)
+    for index in range(count):
+        shard_db = Path(target_dir) / MANIFEST_DIR / f"knowledge-{shard_name(index, count)}.db"
+        if not shard_db.exists():
+            continue
+        conn.execute("ATTACH DATABASE ? AS shard", (str(shard_db),))
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO files SELECT * FROM shard.files")
+            conn.execute(
+                "INSERT INTO symbols (path, kind, name, parent, signature, line, doc) "
+                "SELECT path, kind, name, parent, signature, line, doc FROM shard.symbols"
+            )
+        conn.execute("DETACH DATABASE shard")
+    conn.close()
+
+def source_stamp(src):
+    st = os.stat(src)
+    return st.st_mtime_ns, st.st_size
+
+class PageCache:
+    # Rendered pages keyed by doc path and bounded by total encoded size, so
+    # memory stays flat however many modules the tree has.
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.pages = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        page = self.pages.get(key)
+        if page is not None:
+            self.pages.move_to_end(key)
+        return page
+
+    def put(self, key, page):
+        self.discard(key)
+        body = page[-1]
+        if len(body) > self.max_bytes:
+            return
+        self.pages[key] = page
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self.pages.popitem(last=False)
+            self.size -= len(evicted[-1])
+            self.evictions += 1
+
+    def discard(self, key):
+        page = self.pages.pop(key, None)
+        if page is not None:
+            self.size -= len(page[-1])
+
+class DocServer:
+    def __init__(self, target_dir, commit_hash, cache_bytes):
+        self.target_dir = target_dir
+        self.commit_hash = commit_hash
+        self.pages = PageCache(cache_bytes)
+        # Resident symbol table: source path -> (stat stamp, manifest entry)
+        self.symbols = {}
+        self.sources = {}
+        # tree-sitter parsers are not thread-safe; one lock also guards both caches
+        self.lock = threading.Lock()
+        self.rescan()
+
+    def rescan(self):
+        files = mirror_directory(".", self.target_dir, create=False)
+        self.sources = {dst.relative_to(self.target_dir).as_posix(): (src, dst, rel_root) for src, dst, rel_root in files}
+        live = {src.as_posix() for src, _, _ in files}
+        for path in [path for path in self.symbols if path not in live]:
+            del self.symbols[path]
+        for doc in [doc for doc in self.pages.pages if doc not in self.sources]:
+            self.pages.discard(doc)
+
+    def get(self, doc):
+        if doc == "index.md":
+            timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            return render_index(self.symbol_entries(), timestamp).encode("utf-8")
+        if doc == "SUMMARY.md":
+            return render_summary(self.symbol_entries()).encode("utf-8")
+        if doc.startswith("modules/"):
+            return self.render_page(doc)
+        return self.read_static(doc)
+
+    def render_page(self, doc):
+        if doc not in self.sources:
+            self.rescan()
+        if doc not in self.sources:
+            return None
+        src, dst, rel_root = self.sources[doc]
+        try:
+            stamp = source_stamp(src)
+        except FileNotFoundError:
+            self.rescan()
+            return None
+
+        cached = self.pages.get(doc)
+        source_hash = None
+        if cached is not None:
+            if cached[0] == stamp:
+                self.pages.hits += 1
+                return cached[2]
+            # A touched but unchanged file (checkout, rebase) keeps its page
+            source_hash = hash_source(src)
+            if cached[1] == source_hash:
+                self.pages.hits += 1
+                self.pages.put(doc, (stamp, source_hash, cached[2]))
+                return cached[2]
+
+        self.pages.misses += 1
+        ast = parse_rust_file(src)
+        body = generate_okf_markdown(src, rel_root, ast, self.commit_hash).encode("utf-8")
+        self.pages.put(doc, (stamp, source_hash or hash_source(src), body))
+        self.symbols[src.as_posix()] = (stamp, build_manifest_entry(src, dst, self.target_dir, ast))
+        return body
+
+    def symbol_entries(self):
+        # Only files whose stamp moved since the last request are re-parsed
+        self.rescan()
+        for src, dst, _ in self.sources.values():
+            path = src.as_posix()
+            try:
+                stamp = source_stamp(src)
+            except FileNotFoundError:
+                continue
+            known = self.symbols.get(path)
+            if known is None or known[0] != stamp:
+                self.symbols[path] = (stamp, build_manifest_entry(src, dst, self.target_dir, parse_rust_file(src)))
+        return sort_manifest_entries(entry for _, entry in self.symbols.values())
+
+    def read_static(self, doc):
+        root = Path(self.target_dir).resolve()
+        path = (root / doc).resolve()
+        if root not in path.parents or not path.is_file():
+            return None
+        return path.read_bytes()
+
+def make_doc_handler(docs):
+    class DocHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            doc = unquote(urlsplit(self.path).path).lstrip("/") or "index.md"
+            if not doc.endswith(".md"):
+                self.send_error(404, "Only markdown pages are served")
+                return
+            with docs.lock:
+                body = docs.get(doc)
+            if body is None:
+                self.send_error(404, f"No page for {doc}")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/markdown; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return DocHandler
+
+def serve_docs(target_dir, host, port, cache_mb):
+    # Static ISO pages are cheap; module pages are rendered only when requested
+    Path(target_dir).mkdir(parents=True, exist_ok=True)
+    generate_base_structure(target_dir)
+    docs = DocServer(target_dir, get_git_commit(), int(cache_mb * 1024 * 1024))
+    server = ThreadingHTTPServer((host, port), make_doc_handler(docs))
+    print(f"Serving {len(docs.sources)} modules on demand at http://{host}:{server.server_port}/ (page cache {cache_mb} MiB)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pages = docs.pages
+        print(f"Page cache: {len(pages.pages)} pages, {pages.size} bytes, {pages.hits} hits, "
+              f"{pages.misses} misses, {pages.evictions} evictions")
+
 def main():
+
     parser = argparse.ArgumentParser(description="AST Documentation Generator")
-    parser.add_argument("--mode", choices=["full", "diff"], default="full", help="Execution mode: full or diff")
+    parser.add_argument("--mode", choices=["full", "diff", "serve"], default="full",
+                        help="Execution mode: full, diff, or serve pages on demand")
+    parser.add_argument("--search", help="Full-text search the knowledge store instead of generating")
+    parser.add_argument("--symbol", help="Look up a symbol by exact name in the knowledge store")
+    parser.add_argument("--shard", type=parse_shard, metavar="i/N",
+                        help="Render only the i-th of N stable hash partitions and emit a symbol manifest")
+    parser.add_argument("--merge", action="store_true",
+                        help="Build index.md, SUMMARY.md and logs.md from shard manifests without parsing sources")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind in serve mode")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on in serve mode")
+    parser.add_argument("--cache-mb", type=float, default=PAGE_CACHE_MB,
+                        help="Upper bound on rendered pages held in memory in serve mode")
     args = parser.parse_args()
+    if args.shard and args.mode != "full":
+        parser.error("--shard is only supported in full mode")
+    if args.shard and args.merge:
+        parser.error("--shard and --merge are separate steps")
 
     target_dir = "openwiki"
 
-    if args.mode == "full":
-        shutil.rmtree(target_dir, ignore_errors=True)
+    if args.search or args.symbol:
+        store_path = Path(target_dir) / KNOWLEDGE_DB
+        if not store_path.is_file():
+            raise SystemExit(f"No knowledge store at {store_path}; run a full build (--mode full) "
+                             f"or --merge the shard outputs first")
+        conn = open_knowledge_store(target_dir)
+        print_symbols(search_knowledge_store(conn, args.search) if args.search else lookup_symbol(conn, args.symbol))
+        conn.close()
+        return
+
+    if args.merge:
+        Path(target_dir).mkdir(parents=True, exist_ok=True)
+        generate_base_structure(target_dir)
+        entries, commit_hash, count = merge_shard_manifests(target_dir)
+        merge_shard_knowledge_stores(target_dir, count)
+        write_index_and_logs(target_dir, entries, commit_hash)
+        print(f"Merged {count} shard manifests ({len(entries)} files) into index and changelog in {target_dir}")
+        return
+
+    if args.mode == "serve":
+        serve_docs(target_dir, args.host, args.port, args.cache_mb)
+        return
+
+    if args.shard:
+        clear_shard_outputs(target_dir, *args.shard)
+    elif args.mode == "full":
+        clear_output_tree(target_dir)
 
     Path(target_dir).mkdir(parents=True, exist_ok=True)
     commit_hash = get_git_commit()
@@ -783,16 +1282,37 @@ def main():
     else:
         files_to_process = all_files
 
+    store_name = KNOWLEDGE_DB
+    if args.shard:
+        shard_index, shard_count = args.shard
+        files_to_process = [f for f in files_to_process if shard_of(f[0], shard_count) == shard_index]
+        store_name = f"{MANIFEST_DIR}/knowledge-{shard_name(shard_index, shard_count)}.db"
+        (Path(target_dir) / MANIFEST_DIR).mkdir(parents=True, exist_ok=True)
+        print(f"Shard {shard_index}/{shard_count}: {len(files_to_process)} of {len(all_files)} files.")
+
     print(f"Discovered {len(files_to_process)} files to process in {args.mode} mode.")
 
+    entries = []
+    conn = open_knowledge_store(target_dir, store_name)
     for src, dst, rel_root in files_to_process:
         ast = parse_rust_file(src)
         md = generate_okf_markdown(src, rel_root, ast, commit_hash)
         with open(dst, 'w', encoding='utf-8') as f:
             f.write(md)
+        entries.append(build_manifest_entry(src, dst, target_dir, ast))
+        source_hash = hash_source(src)
+        if not is_indexed(conn, src, source_hash):
+            index_file_symbols(conn, src, dst, target_dir, ast, source_hash, commit_hash)
+    prune_knowledge_store(conn, files_to_process if args.shard else all_files)
+    conn.close()
+
+    if args.shard:
+        manifest_path = write_shard_manifest(target_dir, shard_index, shard_count, entries, commit_hash)
+        print(f"Wrote shard manifest {manifest_path}; run with --merge once every shard is collected")
+        return
 
     if args.mode == "full":
-        generate_index_and_logs(target_dir, files_to_process, commit_hash)
+        write_index_and_logs(target_dir, entries, commit_hash)
     else:
         generate_index_and_logs(target_dir, all_files, commit_hash)
 
@@ -0,0 +1,109 @@
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from generate_openwiki import parse_rust_file  # noqa: E402
+
+
+def fresh(text):
+    # The dict-based parser decoded a new string object for every occurrence
+    return text.encode("utf-8").decode("utf-8") if isinstance(text, str) else text
+
+
+def to_legacy_dicts(ast):
+    classes = {}
+    for name, data in ast.classes.items():
+        classes[fresh(name)] = {
+            "type": data.type,
+            "fields": [fresh(f) for f in data.fields],
+            "raw_fields": [(fresh(n), fresh(t)) for n, t in data.raw_fields],
+            "methods": [fresh(m) for m in data.methods],
+            "line": data.line,
+            "doc": fresh(data.doc),
+        }
+    methods = [{
+        "name": fresh(m.name),
+        "struct": fresh(m.struct),
+        "line": m.line,
+        "calls": [fresh(c) for c in m.calls],
+        "params": ", ".join(f"{n}: {t}" if t else n for n, t in m.params),
+        "ret_type": fresh(m.ret_type),
+        "is_pub": m.is_pub,
+        "doc": fresh(m.doc),
+    } for m in ast.methods]
+    return {
+        "classes": classes,
+        "methods": methods,
+        "dependencies": [fresh(d) for d in ast.dependencies],
+        "relations": [fresh(r) for r in ast.relations],
+    }
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def best_of(build, rounds):
+    best = None
+    for _ in range(max(1, rounds)):
+        started = time.perf_counter()
+        build()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident size of extracted ASTs: slotted records vs legacy dicts")
+    parser.add_argument("roots", nargs="*", default=["."], help="Directories of Rust sources to parse")
+    parser.add_argument("--timing-rounds", type=int, default=20, help="Best-of rounds for the sort timing")
+    args = parser.parse_args()
+
+    # Every file is parsed once: re-parsing the same sources would let interned
+    # records share all names across copies and overstate the saving
+    sources = sorted({src.resolve() for root in args.roots for src in Path(root).rglob("*.rs")
+                      if "target" not in src.parts})
+    if not sources:
+        print(f"No Rust sources under {', '.join(args.roots)}")
+        return
+
+    records, records_bytes = measure(lambda: [parse_rust_file(src) for src in sources])
+    legacy, legacy_bytes = measure(lambda: [to_legacy_dicts(ast) for ast in records])
+
+    symbols = sum(len(ast.classes) + len(ast.methods) for ast in records)
+    print(f"Files parsed: {len(records)} distinct sources")
+    print(f"Symbols resident: {symbols}")
+    print(f"Legacy dicts:     {legacy_bytes / 1024:10.1f} KiB ({legacy_bytes / symbols:7.1f} B/symbol)")
+    print(f"Slotted records:  {records_bytes / 1024:10.1f} KiB ({records_bytes / symbols:7.1f} B/symbol)")
+    print(f"Reduction:        {legacy_bytes / records_bytes:10.2f}x")
+
+    # Both sides time building the SUMMARY entries and sorting them, so the
+    # records' precomputed lowercase key is charged where it is computed
+    def legacy_summary():
+        entries = [(m["name"], m["struct"], "link") for ast in legacy for m in ast["methods"]]
+        return sorted(entries, key=lambda x: x[0].lower())
+
+    def record_summary():
+        return sorted((m.name.lower(), m.name, m.struct or "", "link") for ast in records for m in ast.methods)
+
+    legacy_sort = best_of(legacy_summary, args.timing_rounds)
+    record_sort = best_of(record_summary, args.timing_rounds)
+    entries = sum(len(ast.methods) for ast in records)
+    print(f"SUMMARY build + sort ({entries} entries, best of {args.timing_rounds}): "
+          f"legacy {legacy_sort * 1000:.3f} ms, records {record_sort * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
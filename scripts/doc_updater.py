@@ -1,7 +1,10 @@
-import sys
 import os
 import re
+import argparse
+import sys
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 def get_git_commit(filepath):
@@ -14,6 +17,23 @@ def get_git_commit(filepath):
     except Exception:
         return "unknown"
 
+def atomic_write(path, content):
+    # Write to a sibling temp file and rename over the target, so an interrupted
+    # run leaves either the old doc or the new one, never a truncated file.
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".md", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 def generate_doc_filename(filepath):
     base = os.path.splitext(filepath)[0]
     return base.replace("/", "-") + ".md"
@@ -138,8 +158,7 @@ def update_or_create_doc(filepath, doc_path, commit):
         if old_commit != commit:
             content = re.sub(r'last_verified_commit:\s*".*?"', f'last_verified_commit: "{commit}"', content)
 
-        with open(doc_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        atomic_write(doc_path, content)
         return "updated"
     else:
         title = os.path.basename(filepath).split('.')[0].capitalize()
@@ -176,8 +195,7 @@ flowchart TD
 
 {dep_text}
 """
-        with open(doc_path, 'w', encoding='utf-8') as f:
-            f.write(template)
+        atomic_write(doc_path, template)
         return "created"
 
 def get_original_extension(doc):
@@ -195,7 +213,7 @@ def get_original_extension(doc):
 
 def update_index():
     index_path = ".knowledge/index.md"
-    docs = sorted([d for d in os.listdir(".knowledge") if d.endswith(".md") and d != "index.md"])
+    docs = sorted([d for d in os.listdir(".knowledge") if d.endswith(".md") and d != "index.md" and not d.startswith(".tmp-")])
 
     lines = [
         "# Knowledge Base\n\n",
@@ -206,36 +224,53 @@ def update_index():
         filepath = get_original_extension(doc)
         lines.append(f"- [[{doc}]] - `{filepath}`\n")
 
-    with open(index_path, 'w', encoding='utf-8') as f:
-        f.writelines(lines)
+    atomic_write(index_path, "".join(lines))
 
-def main():
-    if len(sys.argv) < 2:
-        return
+def process_file(filepath):
+    commit = get_git_commit(filepath)
+    doc_filename = generate_doc_filename(filepath)
+    doc_path = os.path.join(".knowledge", doc_filename)
+
+    try:
+        status = update_or_create_doc(filepath, doc_path, commit)
+        ok = True
+    except Exception as e:
+        status = f"failed: {e}"
+        ok = False
+    return f"{filepath} -> {doc_path} ({status})", ok
 
-    changed_files = sys.argv[1:]
+def main():
+    parser = argparse.ArgumentParser(description="Incremental .knowledge doc updater")
+    parser.add_argument("files", nargs="*", help="Changed source files")
+    parser.add_argument("-j", "--jobs", type=int, default=min(32, (os.cpu_count() or 1) * 4),
+                        help="Files processed concurrently")
+    args = parser.parse_args()
+
+    changed_files = list(dict.fromkeys(
+        f for f in args.files if f.startswith("src/") or f.startswith("code/")
+    ))
+    if not changed_files:
+        return 0
 
     if not os.path.exists(".knowledge"):
         os.makedirs(".knowledge")
 
-    summary = []
-
-    for filepath in changed_files:
-        if not (filepath.startswith("src/") or filepath.startswith("code/")):
-            continue
-
-        commit = get_git_commit(filepath)
-        doc_filename = generate_doc_filename(filepath)
-        doc_path = os.path.join(".knowledge", doc_filename)
-
-        status = update_or_create_doc(filepath, doc_path, commit)
-        summary.append(f"{filepath} -> {doc_path} ({status})")
+    # Per-file work is dominated by git subprocesses and file IO, so threads overlap well
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        summary = list(pool.map(process_file, changed_files))
 
     update_index()
 
     print("Documentation Update Summary:")
-    for s in summary:
-        print(s)
+    for line, _ in summary:
+        print(line)
+
+    # Failures are reported per file, but CI must still see the run fail
+    failed = sum(1 for _, ok in summary if not ok)
+    if failed:
+        print(f"{failed} of {len(summary)} file(s) failed", file=sys.stderr)
+        return 1
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
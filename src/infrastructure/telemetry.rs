@@ -1,9 +1,14 @@
-use opentelemetry::KeyValue;
+use axum::{extract::Request, http::HeaderMap};
+use opentelemetry::{global, propagation::Extractor, KeyValue};
 use opentelemetry_otlp::WithExportConfig;
-use opentelemetry_sdk::{runtime, trace::Config, Resource};
+use opentelemetry_sdk::{propagation::TraceContextPropagator, runtime, trace::Config, Resource};
+use tracing_opentelemetry::OpenTelemetrySpanExt;
 use tracing_subscriber::{layer::SubscriberExt, util::SubscriberInitExt, EnvFilter};
 
 pub fn init_telemetry(app_name: &str, endpoint: &str) -> anyhow::Result<()> {
+    // Accept W3C traceparent/tracestate from callers so their spans and ours share a trace
+    global::set_text_map_propagator(TraceContextPropagator::new());
+
     let resource = Resource::new(vec![KeyValue::new("service.name", app_name.to_string())]);
 
     let tracer = opentelemetry_otlp::new_pipeline()
@@ -26,3 +31,31 @@ pub fn init_telemetry(app_name: &str, endpoint: &str) -> anyhow::Result<()> {
 
     Ok(())
 }
+
+struct HeaderExtractor<'a>(&'a HeaderMap);
+
+impl Extractor for HeaderExtractor<'_> {
+    fn get(&self, key: &str) -> Option<&str> {
+        self.0.get(key).and_then(|value| value.to_str().ok())
+    }
+
+    fn keys(&self) -> Vec<&str> {
+        self.0.keys().map(|key| key.as_str()).collect()
+    }
+}
+
+/// Request span for `TraceLayer` that continues the caller's trace when a
+/// `traceparent` header is present, so client spans join the server pipeline.
+pub fn make_request_span(request: &Request) -> tracing::Span {
+    let parent = global::get_text_map_propagator(|propagator| {
+        propagator.extract(&HeaderExtractor(request.headers()))
+    });
+    let span = tracing::info_span!(
+        "request",
+        method = %request.method(),
+        uri = %request.uri(),
+        version = ?request.version(),
+    );
+    span.set_parent(parent);
+    span
+}
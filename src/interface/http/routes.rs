@@ -1,4 +1,5 @@
 use crate::domain::agent::team::AgentTeam;
+use crate::infrastructure::telemetry::make_request_span;
 use crate::interface::http::handlers::{docs_redirect, get_models, route_query};
 use crate::interface::http::middleware::{cors_layer, security_headers};
 use axum::{
@@ -32,5 +33,5 @@ pub fn create_app(state: Arc<AppState>) -> Router {
     if let Some(cors) = cors_layer() {
         router = router.layer(cors);
     }
-    router.layer(TraceLayer::new_for_http())
+    router.layer(TraceLayer::new_for_http().make_span_with(make_request_span))
 }
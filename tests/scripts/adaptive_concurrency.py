@@ -0,0 +1,122 @@
+import csv
+import threading
+import time
+
+from latency_histogram import LatencyHistogram
+
+TIMELINE_COLUMNS = ["elapsed_s", "limit", "in_flight", "completed", "errors", "throughput_rps", "p95_s"]
+
+
+class AIMDLimiter:
+    # Additive-increase / multiplicative-decrease concurrency limit. Overload
+    # signals (5xx, 429, timeouts) cut the limit at once; otherwise every window
+    # of completions compares its p95 against the uncongested baseline and either
+    # grows the limit by one or backs off when latency has drifted too far. The
+    # baseline follows a faster window down at once, remembering the limit it was
+    # measured at. It only moves up (by baseline_alpha of the gap) on windows run
+    # at that limit or below: slower responses with more requests in flight are
+    # queueing and must not raise it, slower responses without are the service.
+    def __init__(self, initial=4, min_limit=1, max_limit=64, backoff=0.7, tolerance=2.0,
+                 min_window=10, baseline_alpha=0.2):
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.min_window = min_window
+        self.baseline_alpha = baseline_alpha
+        self.baseline_p95 = None
+        self.baseline_limit = None
+        self.decreases = 0
+        self._epoch = 0
+        self._window = LatencyHistogram()
+        self._lock = threading.Lock()
+
+    @property
+    def current(self):
+        return int(self.limit)
+
+    def start(self):
+        # Requests started before the latest decrease must not trigger another
+        # one: a single stall would otherwise collapse the limit to the floor.
+        return self._epoch
+
+    def on_overload(self, epoch):
+        with self._lock:
+            if epoch == self._epoch:
+                self._decrease()
+
+    def on_success(self, epoch, latency):
+        with self._lock:
+            self._window.record(latency)
+            if self._window.total < max(self.min_window, self.current):
+                return
+            p95 = self._window.percentile(95)
+            self._window = LatencyHistogram()
+            if self.baseline_p95 is None or p95 < self.baseline_p95:
+                self.baseline_p95 = p95
+                self.baseline_limit = self.current
+            elif self.current <= self.baseline_limit:
+                self.baseline_p95 += self.baseline_alpha * (p95 - self.baseline_p95)
+            if p95 > self.baseline_p95 * self.tolerance:
+                if epoch == self._epoch:
+                    self._decrease()
+                return
+            self.limit = min(self.max_limit, self.limit + 1)
+
+    def _decrease(self):
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self._window = LatencyHistogram()
+        self._epoch += 1
+        self.decreases += 1
+
+
+class ThroughputTimeline:
+    # Completions bucketed into fixed intervals, each row written as it closes
+    def __init__(self, path=None, interval=10.0):
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.rows = []
+        self._next_at = self.started + interval
+        self._latency = LatencyHistogram()
+        self._completed = 0
+        self._errors = 0
+        self._file = open(path, "w", newline="", encoding="utf-8") if path else None
+        self._writer = csv.DictWriter(self._file, fieldnames=TIMELINE_COLUMNS) if self._file else None
+        if self._writer:
+            self._writer.writeheader()
+
+    def record(self, ok, latency):
+        self._completed += 1
+        if ok:
+            self._latency.record(latency)
+        else:
+            self._errors += 1
+
+    def tick(self, limit, in_flight, force=False):
+        now = time.perf_counter()
+        if now < self._next_at and not force:
+            return None
+        span = now - (self._next_at - self.interval)
+        row = {
+            "elapsed_s": round(now - self.started, 1),
+            "limit": limit,
+            "in_flight": in_flight,
+            "completed": self._completed,
+            "errors": self._errors,
+            "throughput_rps": round((self._completed - self._errors) / span, 3) if span > 0 else 0.0,
+            "p95_s": round(self._latency.percentile(95), 3),
+        }
+        self.rows.append(row)
+        if self._writer:
+            self._writer.writerow(row)
+            self._file.flush()
+        self._next_at = now + self.interval
+        self._latency = LatencyHistogram()
+        self._completed = 0
+        self._errors = 0
+        return row
+
+    def close(self):
+        if self._file:
+            self._file.close()
@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import csv
+import datetime
+import os
+import time
+
+from load_test import DEFAULT_URL, build_payload, default_connections, open_client, run_worker_step_async
+from test_connection import ARTIFACTS_DIR, DEFAULT_MODEL, DEFAULT_PROMPT, HEADERS
+
+BENCH_COLUMNS = [
+    "protocol", "concurrency", "connections", "requests", "errors", "throughput_rps",
+    "p50_s", "p99_s", "ttft_p50_s", "ttft_p99_s", "peak_sockets", "cpu_s", "cpu_ms_per_request",
+]
+SOCKET_SAMPLE_S = 0.1
+
+
+def count_sockets():
+    # Linux only: every open socket of this process shows up as "socket:[inode]"
+    fd_dir = "/proc/self/fd"
+    count = 0
+    for fd in os.listdir(fd_dir):
+        try:
+            if os.readlink(os.path.join(fd_dir, fd)).startswith("socket:"):
+                count += 1
+        except OSError:
+            pass
+    return count
+
+
+async def sample_sockets(peak, baseline):
+    while True:
+        peak[0] = max(peak[0], count_sockets() - baseline)
+        await asyncio.sleep(SOCKET_SAMPLE_S)
+
+
+async def run_protocol(args, payload, http2):
+    protocol = "HTTP/2" if http2 else "HTTP/1.1"
+    connections = (args.connections if http2 else None) or default_connections(args.concurrency, http2)
+    async with open_client(args.concurrency, args.timeout, http2, connections) as client:
+        # One request up front proves the negotiated protocol before load starts
+        response = await client.post(args.url, json=payload, headers=HEADERS)
+        if response.http_version != protocol:
+            raise SystemExit(f"{protocol} requested but the server answered over {response.http_version}")
+
+    baseline = count_sockets() if os.path.isdir("/proc/self/fd") else None
+    peak = [0]
+    sampler = asyncio.create_task(sample_sockets(peak, baseline)) if baseline is not None else None
+    cpu_started = time.process_time()
+    stats = await run_worker_step_async(args.url, payload, "concurrency", args.concurrency, args.hold,
+                                        args.timeout, time.time(), http2, connections)
+    cpu = time.process_time() - cpu_started
+    if sampler is not None:
+        sampler.cancel()
+
+    ok = stats["requests"] - stats["errors"]
+    return {
+        "protocol": protocol,
+        "concurrency": args.concurrency,
+        "connections": connections,
+        "requests": stats["requests"],
+        "errors": stats["errors"],
+        "throughput_rps": round(ok / stats["elapsed"], 3) if stats["elapsed"] else 0.0,
+        "p50_s": round(stats["latency"].percentile(50), 4),
+        "p99_s": round(stats["latency"].percentile(99), 4),
+        "ttft_p50_s": round(stats["ttft"].percentile(50), 4),
+        "ttft_p99_s": round(stats["ttft"].percentile(99), 4),
+        "peak_sockets": peak[0] if baseline is not None else "n/a",
+        "cpu_s": round(cpu, 3),
+        "cpu_ms_per_request": round(cpu * 1000 / stats["requests"], 3) if stats["requests"] else 0.0,
+    }
+
+
+def main(args):
+    payload = build_payload(args.prompt, args.model, args.stream)
+    os.makedirs(os.path.dirname(os.path.abspath(args.csv)), exist_ok=True)
+    print(f"{args.concurrency} concurrent {'streaming ' if args.stream else ''}requests for {args.hold}s per protocol")
+    print(" | ".join(f"{c:>{max(len(c), 8)}}" for c in BENCH_COLUMNS))
+    rows = []
+    for http2 in (False, True):
+        row = asyncio.run(run_protocol(args, payload, http2))
+        rows.append(row)
+        print(" | ".join(f"{row[c]:>{max(len(c), 8)}}" for c in BENCH_COLUMNS), flush=True)
+
+    with open(args.csv, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=BENCH_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    h1, h2 = rows
+    if h1["cpu_ms_per_request"] and h2["cpu_ms_per_request"]:
+        print(f"\nHTTP/2 vs HTTP/1.1: p99 {h2['p99_s']}s vs {h1['p99_s']}s, "
+              f"client CPU per request {h2['cpu_ms_per_request'] / h1['cpu_ms_per_request']:.2f}x, "
+              f"sockets {h2['peak_sockets']} vs {h1['peak_sockets']}")
+    print(f"Results saved to: {args.csv}")
+
+
+if __name__ == "__main__":
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    arg_parser = argparse.ArgumentParser(description="Compare HTTP/1.1 and HTTP/2 transports at high concurrency")
+    arg_parser.add_argument("--url", default=DEFAULT_URL,
+                            help="Endpoint that accepts h2c; point it at the backend, nginx only speaks HTTP/1.1 here")
+    arg_parser.add_argument("--model", default=DEFAULT_MODEL)
+    arg_parser.add_argument("--prompt", default=DEFAULT_PROMPT)
+    arg_parser.add_argument("--stream", action=argparse.BooleanOptionalAction, default=True,
+                            help="Request SSE streaming completions (long-lived streams are where HTTP/2 helps)")
+    arg_parser.add_argument("--concurrency", type=int, default=200, help="Concurrent in-flight requests")
+    arg_parser.add_argument("--connections", type=int, help="HTTP/2 connections to multiplex over")
+    arg_parser.add_argument("--hold", type=float, default=30.0, help="Seconds to run each protocol")
+    arg_parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    arg_parser.add_argument("--csv", default=os.path.join(ARTIFACTS_DIR, f"http2_bench_{timestamp}.csv"))
+    main(arg_parser.parse_args())
@@ -0,0 +1,269 @@
+import argparse
+import datetime
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from latency_histogram import LatencyHistogram
+from test_connection import ARTIFACTS_DIR
+
+DEFAULT_STORE = os.path.join(ARTIFACTS_DIR, "bench_results.jsonl")
+BOOTSTRAP_ITERATIONS = 1000
+# Relative change a confidence interval must clear before a difference counts
+DEFAULT_THRESHOLD = 0.05
+# Metrics where a larger value is worse
+LOWER_IS_BETTER = {"p50_s": True, "p99_s": True, "throughput_rps": False}
+
+
+def git_commit():
+    # Same short hash generate_openwiki stamps on its pages, without importing
+    # the doc generator (and its tree-sitter parser) into the HTTP load tools
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"]).decode("utf-8").strip()
+    except Exception:
+        return "unknown"
+
+
+def git_dirty():
+    try:
+        return bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"]).strip())
+    except Exception:
+        return None
+
+
+def new_series(name, latency, per_second=None):
+    # latency: LatencyHistogram; per_second: successful completions per wall-clock second
+    return {"name": name, "latency": latency.to_dict(), "per_second": list(per_second or [])}
+
+
+def append_run(benchmark, series, config=None, path=DEFAULT_STORE):
+    # Append-only: one JSON line per run, never rewritten
+    commit = git_commit()
+    record = {
+        "run_id": f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}-{commit}",
+        "benchmark": benchmark,
+        "commit": commit,
+        "dirty": git_dirty(),
+        "recorded_at": datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "config": config or {},
+        "series": series,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    return record
+
+
+def load_runs(path=DEFAULT_STORE, benchmark=None):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    return [run for run in runs if benchmark is None or run["benchmark"] == benchmark]
+
+
+def resolve_run(runs, ref):
+    # "latest", a negative index ("-2" is the run before latest), a run id, or a commit prefix
+    if not runs:
+        raise SystemExit("The results store has no matching runs")
+    if ref == "latest":
+        return runs[-1]
+    if ref.lstrip("-").isdigit() and ref.startswith("-"):
+        return runs[int(ref)]
+    matches = [run for run in runs if run["run_id"] == ref or run["commit"].startswith(ref)]
+    if not matches:
+        raise SystemExit(f"No run matches '{ref}'")
+    return matches[-1]
+
+
+class Sample:
+    # Bootstrap view of one series across one or more runs. Resampling is
+    # two-level: runs are drawn with replacement first, then each drawn run's
+    # latency buckets and per-second throughput counts, so run-to-run variation
+    # (usually the larger noise) widens the interval instead of averaging away.
+    def __init__(self, series_list):
+        self.runs = []
+        self.latency = LatencyHistogram()
+        self.per_second = []
+        for series in series_list:
+            latency = LatencyHistogram.from_dict(series["latency"])
+            indexes = sorted(latency.counts)
+            cum_weights = list(itertools.accumulate(latency.counts[index] for index in indexes))
+            self.runs.append((latency, indexes, cum_weights, series["per_second"]))
+            self.latency.merge(latency)
+            self.per_second.extend(series["per_second"])
+
+    def point(self):
+        return {
+            "p50_s": self.latency.percentile(50),
+            "p99_s": self.latency.percentile(99),
+            "throughput_rps": sum(self.per_second) / len(self.per_second) if self.per_second else None,
+        }
+
+    def run_effects(self):
+        # Each run's metric relative to the pooled value: how far a single run
+        # lands from the population it belongs to
+        pooled = self.point()
+        effects = {metric: [] for metric in LOWER_IS_BETTER}
+        if len(self.runs) < 2:
+            return effects
+        for latency, _, _, seconds in self.runs:
+            run = {
+                "p50_s": latency.percentile(50),
+                "p99_s": latency.percentile(99),
+                "throughput_rps": sum(seconds) / len(seconds) if seconds else None,
+            }
+            for metric in LOWER_IS_BETTER:
+                if pooled[metric] and run[metric] is not None:
+                    effects[metric].append(run[metric] / pooled[metric])
+        return effects
+
+    def resample(self, rng):
+        histogram = LatencyHistogram()
+        per_second = []
+        runs = rng.choices(self.runs, k=len(self.runs)) if len(self.runs) > 1 else self.runs
+        for latency, indexes, cum_weights, seconds in runs:
+            if latency.total:
+                for index in rng.choices(indexes, cum_weights=cum_weights, k=latency.total):
+                    histogram.counts[index] = histogram.counts.get(index, 0) + 1
+                histogram.total += latency.total
+                histogram.min = latency.min if histogram.min is None else min(histogram.min, latency.min)
+                histogram.max = latency.max if histogram.max is None else max(histogram.max, latency.max)
+            if seconds:
+                per_second.extend(rng.choices(seconds, k=len(seconds)))
+        return {
+            "p50_s": histogram.percentile(50),
+            "p99_s": histogram.percentile(99),
+            "throughput_rps": sum(per_second) / len(per_second) if per_second else None,
+        }
+
+
+def compare_samples(baseline, candidate, iterations=BOOTSTRAP_ITERATIONS, threshold=DEFAULT_THRESHOLD, seed=0):
+    # Bootstrap the relative change (candidate / baseline - 1) of each metric
+    # and only call it a regression or improvement when the whole 95% interval
+    # lies beyond the threshold. A single candidate run carries its own run
+    # effect, which one run cannot show; it is drawn from the baseline runs' spread.
+    rng = random.Random(seed)
+    base_point, cand_point = baseline.point(), candidate.point()
+    effects = baseline.run_effects() if len(candidate.runs) == 1 else {}
+    deltas = {metric: [] for metric in LOWER_IS_BETTER}
+    for _ in range(iterations):
+        base, cand = baseline.resample(rng), candidate.resample(rng)
+        for metric in LOWER_IS_BETTER:
+            if base[metric] and cand[metric] is not None:
+                effect = rng.choice(effects[metric]) if effects.get(metric) else 1.0
+                deltas[metric].append(cand[metric] / effect / base[metric] - 1.0)
+
+    results = []
+    for metric, lower_is_better in LOWER_IS_BETTER.items():
+        samples = sorted(deltas[metric])
+        if not samples:
+            continue
+        low = samples[int(0.025 * (len(samples) - 1))]
+        high = samples[int(0.975 * (len(samples) - 1))]
+        worse_low, worse_high = (low, high) if lower_is_better else (-high, -low)
+        if worse_low > threshold:
+            verdict = "REGRESSION"
+        elif worse_high < -threshold:
+            verdict = "improved"
+        else:
+            verdict = "no change"
+        results.append({
+            "metric": metric,
+            "baseline": base_point[metric],
+            "candidate": cand_point[metric],
+            "change": cand_point[metric] / base_point[metric] - 1.0 if base_point[metric] else None,
+            "ci_low": low,
+            "ci_high": high,
+            "verdict": verdict,
+        })
+    return results
+
+
+def compare(args):
+    runs = load_runs(args.store, args.benchmark)
+    candidate = resolve_run(runs, args.candidate)
+    if args.baseline:
+        baselines = [resolve_run(runs, args.baseline)]
+    else:
+        earlier = [run for run in runs[:runs.index(candidate)] if run["benchmark"] == candidate["benchmark"]]
+        baselines = earlier[-args.baseline_runs:]
+        if not baselines:
+            raise SystemExit(f"No earlier {candidate['benchmark']} runs to form a baseline")
+
+    print(f"Candidate: {candidate['run_id']} ({candidate['benchmark']}, commit {candidate['commit']}"
+          f"{', dirty tree' if candidate.get('dirty') else ''})")
+    print(f"Baseline:  {', '.join(run['run_id'] for run in baselines)}")
+    print(f"{'series':<18} {'metric':<15} {'baseline':>10} {'candidate':>10} {'change':>8} {'95% CI':>19}  verdict")
+
+    regressions = 0
+    for series in candidate["series"]:
+        matching = [s for run in baselines for s in run["series"] if s["name"] == series["name"]]
+        if not matching:
+            print(f"{series['name']:<18} (no baseline series)")
+            continue
+        for row in compare_samples(Sample(matching), Sample([series]), args.iterations, args.threshold):
+            regressions += row["verdict"] == "REGRESSION"
+            change = f"{row['change'] * 100:+.1f}%" if row["change"] is not None else "n/a"
+            interval = f"[{row['ci_low'] * 100:+.1f}%, {row['ci_high'] * 100:+.1f}%]"
+            print(f"{series['name']:<18} {row['metric']:<15} {row['baseline']:>10.4f} {row['candidate']:>10.4f} "
+                  f"{change:>8} {interval:>19}  {row['verdict']}")
+    print(f"\n{regressions} regression(s) beyond {args.threshold * 100:.0f}% at 95% confidence")
+    return 1 if regressions else 0
+
+
+def list_runs(args):
+    for run in load_runs(args.store, args.benchmark):
+        names = ", ".join(series["name"] for series in run["series"])
+        print(f"{run['run_id']:<28} {run['benchmark']:<14} {run['commit']:<10}{' dirty' if run.get('dirty') else '      '}  {names}")
+    return 0
+
+
+def time_command(args):
+    # Wall-clock timings of any command, e.g. the documentation pipeline
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    if not command:
+        raise SystemExit("Nothing to time: pass the command after --")
+    latency = LatencyHistogram()
+    for i in range(args.repeat):
+        started = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - started
+        latency.record(elapsed)
+        print(f"Run {i + 1}/{args.repeat}: {elapsed:.3f}s")
+    record = append_run(args.name, [new_series(args.name, latency)], {"command": command}, args.store)
+    print(f"Recorded {record['run_id']} in {args.store}")
+    return 0
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Append-only benchmark results store with bootstrap comparison")
+    arg_parser.add_argument("--store", default=DEFAULT_STORE, help="Results file (JSON lines)")
+    commands = arg_parser.add_subparsers(dest="command_name", required=True)
+
+    compare_parser = commands.add_parser("compare", help="Compare a run against another run or a rolling baseline")
+    compare_parser.add_argument("candidate", nargs="?", default="latest", help="Run id, commit prefix, 'latest' or -N")
+    compare_parser.add_argument("baseline", nargs="?", help="Run to compare against (default: rolling baseline)")
+    compare_parser.add_argument("--benchmark", help="Only consider runs of this benchmark")
+    compare_parser.add_argument("--baseline-runs", type=int, default=5, help="Earlier runs pooled into the rolling baseline")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="Relative change the 95%% interval must clear to count")
+    compare_parser.add_argument("--iterations", type=int, default=BOOTSTRAP_ITERATIONS, help="Bootstrap resamples")
+    compare_parser.set_defaults(handler=compare)
+
+    list_parser = commands.add_parser("list", help="List recorded runs")
+    list_parser.add_argument("--benchmark", help="Only list runs of this benchmark")
+    list_parser.set_defaults(handler=list_runs)
+
+    time_parser = commands.add_parser("time", help="Time a command and record the run")
+    time_parser.add_argument("--name", required=True, help="Benchmark name, e.g. doc_pipeline")
+    time_parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions")
+    time_parser.add_argument("command", nargs=argparse.REMAINDER, help="Command to time, after --")
+    time_parser.set_defaults(handler=time_command)
+
+    parsed = arg_parser.parse_args()
+    sys.exit(parsed.handler(parsed))
@@ -0,0 +1,206 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+
+import httpx
+
+from sse_parser import DONE
+
+SERVICE_NAME = "agent-team-client"
+SCOPE_NAME = "tests.scripts.client_tracing"
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+_STAGE = re.compile(r"\[([^\]]+)\]")
+
+
+def _attributes(values):
+    attributes = []
+    for key, value in values.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            encoded = {"boolValue": value}
+        elif isinstance(value, int):
+            encoded = {"intValue": str(value)}
+        elif isinstance(value, float):
+            encoded = {"doubleValue": value}
+        else:
+            encoded = {"stringValue": str(value)}
+        attributes.append({"key": key, "value": encoded})
+    return attributes
+
+
+def progress_stage(delta):
+    # Progress events carry "[stage] message" in reasoning_content
+    match = _STAGE.match(delta.get("reasoning_content") or "")
+    return match.group(1) if match else None
+
+
+class RequestTrace:
+    # One client request: a CLIENT root span whose id travels in the traceparent
+    # header (so server spans become its children) plus child spans built from
+    # httpx/httpcore trace events and stream milestones.
+    __slots__ = ("tracer", "trace_id", "span_id", "sampled", "name", "start_ns", "attributes",
+                 "marks", "children", "stage", "stage_start_ns", "end_reason")
+
+    def __init__(self, tracer, name, sampled, attributes):
+        self.tracer = tracer
+        self.trace_id = os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.sampled = sampled
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.attributes = attributes
+        self.marks = {}
+        self.children = []
+        self.stage = None
+        self.stage_start_ns = None
+        self.end_reason = None
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def headers(self, headers):
+        return {**headers, "traceparent": self.traceparent}
+
+    def mark(self, name, at_ns=None):
+        # First occurrence wins, e.g. only the first body chunk is the first byte
+        self.marks.setdefault(name, at_ns or time.time_ns())
+
+    def on_httpx_event(self, event_name, info):
+        # "http11.send_request_headers.started" and "http2.send_request_headers.started"
+        # both become "send_request_headers.started"
+        self.mark(event_name.split(".", 1)[1])
+
+    async def on_httpx_event_async(self, event_name, info):
+        self.on_httpx_event(event_name, info)
+
+    def httpx_extensions(self):
+        return {"trace": self.on_httpx_event}
+
+    def httpx_async_extensions(self):
+        return {"trace": self.on_httpx_event_async}
+
+    def add_span(self, name, start_ns, end_ns, kind=SPAN_KIND_INTERNAL, **attributes):
+        if start_ns is None or end_ns is None:
+            return
+        self.children.append(self._span(name, os.urandom(8).hex(), self.span_id, start_ns, end_ns, kind, attributes))
+
+    def observe(self, event):
+        # Feed every parsed SSE event: progress stages, first token, end of stream
+        if event is DONE:
+            self.end_reason = self.end_reason or "done"
+            return
+        delta, finish_reason = event
+        stage = progress_stage(delta)
+        if stage is not None:
+            self.progress(stage)
+        elif delta.get("content"):
+            self.token()
+        if finish_reason:
+            self.end_reason = finish_reason
+
+    def progress(self, stage):
+        now = time.time_ns()
+        self._close_stage(now)
+        self.stage = stage
+        self.stage_start_ns = now
+
+    def token(self):
+        now = time.time_ns()
+        self._close_stage(now)
+        self.mark("first_token", now)
+
+    def _close_stage(self, now):
+        if self.stage is not None:
+            self.add_span(f"progress {self.stage}", self.stage_start_ns, now, **{"agent.stage": self.stage})
+            self.stage = None
+
+    def finish(self, status_code=None, error=None, **attributes):
+        if not self.sampled:
+            return
+        end_ns = time.time_ns()
+        self._close_stage(end_ns)
+        marks = self.marks
+        sent = marks.get("send_request_body.complete")
+        connected = marks.get("start_tls.complete") or marks.get("connect_tcp.complete")
+        self.add_span("connect", marks.get("connect_tcp.started"), connected)
+        self.add_span("request.send", marks.get("send_request_headers.started"), sent)
+        self.add_span("response.headers", sent, marks.get("receive_response_headers.complete"))
+        self.add_span("response.first_byte", sent, marks.get("first_byte"))
+        stream_start = marks.get("first_token") or marks.get("first_byte")
+        self.add_span("stream.end", stream_start, end_ns, **{"stream.end_reason": self.end_reason or "eof"})
+
+        root_attributes = {**self.attributes, **attributes, "http.response.status_code": status_code,
+                           "error.type": error}
+        root = self._span(self.name, self.span_id, None, self.start_ns, end_ns, SPAN_KIND_CLIENT, root_attributes)
+        root["status"] = {"code": STATUS_ERROR, "message": error} if error else {"code": STATUS_OK}
+        self.tracer.record([root] + self.children)
+
+    def _span(self, name, span_id, parent_id, start_ns, end_ns, kind, attributes):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": span_id,
+            "name": name,
+            "kind": kind,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(max(start_ns, end_ns)),
+            "attributes": _attributes(attributes),
+        }
+        if parent_id:
+            span["parentSpanId"] = parent_id
+        return span
+
+
+class Tracer:
+    def __init__(self, sample_rate=1.0, attributes=None):
+        self.sample_rate = sample_rate
+        self.attributes = attributes or {}
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def start(self, name, **attributes):
+        sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        return RequestTrace(self, name, sampled, {**self.attributes, **attributes})
+
+    def record(self, spans):
+        with self._lock:
+            self.spans.extend(spans)
+
+    def drain(self):
+        with self._lock:
+            spans, self.spans = self.spans, []
+        return spans
+
+
+def otlp_request(spans, service_name=SERVICE_NAME):
+    # ExportTraceServiceRequest in OTLP/JSON encoding (hex ids, int64 as strings)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _attributes({"service.name": service_name})},
+            "scopeSpans": [{"scope": {"name": SCOPE_NAME}, "spans": spans}],
+        }]
+    }
+
+
+def write_otlp_json(path, spans, service_name=SERVICE_NAME):
+    # One request per line, the layout the collector's otlpjsonfile receiver reads
+    if not spans:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(otlp_request(spans, service_name), separators=(",", ":")) + "\n")
+
+
+def post_otlp_json(endpoint, spans, service_name=SERVICE_NAME, timeout=10):
+    # Any OTLP/HTTP receiver (collector, Jaeger, Tempo) accepts JSON on /v1/traces
+    if not spans:
+        return
+    response = httpx.post(endpoint, json=otlp_request(spans, service_name), timeout=timeout)
+    response.raise_for_status()
@@ -0,0 +1,225 @@
+import argparse
+import asyncio
+import base64
+import csv
+import datetime
+import itertools
+import os
+import random
+import re
+import time
+
+from bench_store import DEFAULT_STORE, append_run, new_series
+from latency_histogram import LatencyHistogram
+from load_test import DEFAULT_URL, open_client
+from streaming_client import stream_completion
+from test_connection import ARTIFACTS_DIR, DEFAULT_MODEL, DEFAULT_PROMPT
+
+SCALING_COLUMNS = [
+    "history_messages", "requests", "errors", "request_kb", "response_kb",
+    "p50_s", "p99_s", "ttft_p50_s", "ttft_p99_s",
+]
+FILLER_WORDS = (
+    "agent team plan search summary context tool result message history reply user assistant "
+    "request latency token stream answer question detail image review step"
+).split()
+# Reply used in place of a failed turn, so the session keeps its growth curve
+FALLBACK_REPLY_CHARS = 200
+_THINK = re.compile(r"<think>.*?</think>\s*", re.S)
+
+
+def filler(chars, rng):
+    words = []
+    length = 0
+    while length < chars:
+        word = rng.choice(FILLER_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:chars]
+
+
+def inline_image_url(kb, rng):
+    # Data URL of roughly `kb` KB, the way clients inline screenshots; random
+    # bytes keep compression from shrinking it
+    raw = rng.randbytes(max(1, kb * 1024 * 3 // 4))
+    return "data:image/png;base64," + base64.b64encode(raw).decode("ascii")
+
+
+def user_message(turn, args, rng):
+    # First turn asks the configured prompt; later turns are filler of --user-chars.
+    # Every --image-every-th turn becomes a content list with an ImageUrl part.
+    text = args.prompt if turn == 0 else filler(args.user_chars, rng)
+    if not args.image_every or (turn + 1) % args.image_every:
+        return {"role": "user", "content": text}
+    url = args.image_url or inline_image_url(args.image_kb, rng)
+    return {
+        "role": "user",
+        "content": [
+            {"type": "text", "text": text},
+            {"type": "image_url", "image_url": {"url": url, "detail": args.image_detail}},
+        ],
+    }
+
+
+def assistant_reply(result, args, rng):
+    # Progress events arrive as <think> blocks inside content; only the answer
+    # goes back into the history, as a real chat client would send it
+    if args.reply_chars is not None:
+        return filler(args.reply_chars, rng)
+    reply = _THINK.sub("", "".join(result["content"])).strip()
+    return reply or filler(FALLBACK_REPLY_CHARS, rng)
+
+
+def new_bucket():
+    return {
+        "latency": LatencyHistogram(),
+        "ttft": LatencyHistogram(),
+        "requests": 0,
+        "errors": 0,
+        # Requests that got past connect, answered or timed out; failed connects send nothing
+        "sent": 0,
+        "request_bytes": 0,
+        "response_bytes": 0,
+    }
+
+
+async def run_session(client, args, session, buckets):
+    rng = random.Random(args.seed + session)
+    messages = []
+    for turn in range(args.turns):
+        messages.append(user_message(turn, args, rng))
+        payload = {"model": args.model, "messages": list(messages), "stream": args.stream}
+        started = time.perf_counter()
+        result = await stream_completion(client, args.url, payload, collect_content=True, started=started)
+        latency = time.perf_counter() - started
+
+        bucket = buckets.setdefault(len(messages), new_bucket())
+        bucket["requests"] += 1
+        bucket["errors"] += bool(result["error"])
+        if result["request_bytes"]:
+            bucket["sent"] += 1
+            bucket["request_bytes"] += result["request_bytes"]
+        bucket["response_bytes"] += result["response_bytes"]
+        bucket["latency"].record(latency)
+        bucket["ttft"].record(result["ttft"] if result["ttft"] is not None else latency)
+        messages.append({"role": "assistant", "content": assistant_reply(result, args, rng)})
+        if args.think > 0:
+            await asyncio.sleep(rng.expovariate(1.0 / args.think))
+
+
+async def run_workload(args):
+    buckets = {}
+    async with open_client(args.sessions, args.timeout, args.http2) as client:
+        sessions = itertools.count()
+        deadline = time.perf_counter() + args.hold if args.hold else None
+
+        async def user():
+            # With --hold, each virtual user starts a fresh session when the last ends
+            while True:
+                await run_session(client, args, next(sessions), buckets)
+                if deadline is None or time.perf_counter() >= deadline:
+                    return
+
+        await asyncio.gather(*(user() for _ in range(args.sessions)))
+    return buckets
+
+
+def summarize(history, bucket):
+    requests_count = bucket["requests"]
+    sent = bucket["sent"]
+    return {
+        "history_messages": history,
+        "requests": requests_count,
+        "errors": bucket["errors"],
+        "request_kb": round(bucket["request_bytes"] / sent / 1024, 2) if sent else 0.0,
+        "response_kb": round(bucket["response_bytes"] / sent / 1024, 2) if sent else 0.0,
+        "p50_s": round(bucket["latency"].percentile(50), 4),
+        "p99_s": round(bucket["latency"].percentile(99), 4),
+        "ttft_p50_s": round(bucket["ttft"].percentile(50), 4),
+        "ttft_p99_s": round(bucket["ttft"].percentile(99), 4),
+    }
+
+
+def fit_slope(points):
+    # Least-squares slope of y over x
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if not spread:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+def main(args):
+    os.makedirs(os.path.dirname(os.path.abspath(args.csv)), exist_ok=True)
+    images = f", an image every {args.image_every} user turn(s)" if args.image_every else ""
+    print(f"{args.sessions} concurrent session(s) of {args.turns} turns{images}")
+    buckets = asyncio.run(run_workload(args))
+
+    rows = [summarize(history, buckets[history]) for history in sorted(buckets)]
+    print(" | ".join(f"{c:>{max(len(c), 8)}}" for c in SCALING_COLUMNS))
+    for row in rows:
+        print(" | ".join(f"{row[c]:>{max(len(c), 8)}}" for c in SCALING_COLUMNS))
+    with open(args.csv, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SCALING_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print()
+    sized = [(row["request_kb"], row["p50_s"]) for row in rows if row["request_kb"]]
+    slope = fit_slope(sized) if len(sized) > 1 else None
+    if slope is not None:
+        print(f"p50 latency grows {slope * 1000:.2f} ms per KB of request")
+    # The limit is the history length just before the first one that fails,
+    # even if a longer history happens to pass again later
+    failing = next((i for i, row in enumerate(rows) if row["p99_s"] > args.max_p99 or row["errors"]), None)
+    if failing is None:
+        print(f"p99 stayed under {args.max_p99}s up to {rows[-1]['history_messages']} messages "
+              f"({rows[-1]['request_kb']} KB); raise --turns to find the limit")
+    elif failing:
+        limit = rows[failing - 1]
+        print(f"Trimming hint: keep history to {limit['history_messages']} messages (~{limit['request_kb']} KB) "
+              f"for p99 under {args.max_p99}s")
+    else:
+        print(f"p99 exceeded {args.max_p99}s (or requests failed) from the first turn")
+    print(f"Results saved to: {args.csv}")
+
+    if args.store:
+        series = [new_series(f"history {history}", buckets[history]["latency"]) for history in sorted(buckets)]
+        config = {key: getattr(args, key) for key in ("url", "model", "stream", "sessions", "turns", "user_chars",
+                                                       "reply_chars", "image_every", "image_kb", "http2")}
+        record = append_run("conversation", series, config, args.store)
+        print(f"Run {record['run_id']} recorded in {args.store}")
+
+
+if __name__ == "__main__":
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    arg_parser = argparse.ArgumentParser(description="Multi-turn conversation workload: latency and request size "
+                                                     "as the history grows")
+    arg_parser.add_argument("--url", default=DEFAULT_URL)
+    arg_parser.add_argument("--model", default=DEFAULT_MODEL)
+    arg_parser.add_argument("--prompt", default=DEFAULT_PROMPT, help="First user turn of every session")
+    arg_parser.add_argument("--stream", action="store_true", help="Request SSE streaming completions")
+    arg_parser.add_argument("--http2", action="store_true", help="Multiplex sessions over HTTP/2")
+    arg_parser.add_argument("--sessions", type=int, default=4, help="Concurrent conversations")
+    arg_parser.add_argument("--turns", type=int, default=16, help="User turns per conversation")
+    arg_parser.add_argument("--hold", type=float, default=0.0,
+                            help="Keep starting new sessions for this many seconds (0 runs each user once)")
+    arg_parser.add_argument("--think", type=float, default=0.0, help="Mean pause (s) between turns of a session")
+    arg_parser.add_argument("--user-chars", type=int, default=400, help="Length of each follow-up user turn")
+    arg_parser.add_argument("--reply-chars", type=int,
+                            help="Replace assistant replies with filler of this length (default: the real answer)")
+    arg_parser.add_argument("--image-every", type=int, default=4,
+                            help="Attach an image_url part to every Nth user turn (0 disables)")
+    arg_parser.add_argument("--image-kb", type=int, default=64, help="Size of the inline base64 image")
+    arg_parser.add_argument("--image-url", help="Reference this URL instead of inlining a data: URL")
+    arg_parser.add_argument("--image-detail", choices=["auto", "low", "high"], default="auto")
+    arg_parser.add_argument("--max-p99", type=float, default=60.0,
+                            help="p99 latency (s) the trimming hint must stay under")
+    arg_parser.add_argument("--seed", type=int, default=0, help="Seed for filler text and image bytes")
+    arg_parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    arg_parser.add_argument("--csv", default=os.path.join(ARTIFACTS_DIR, f"conversation_scaling_{timestamp}.csv"))
+    arg_parser.add_argument("--store", nargs="?", const=DEFAULT_STORE,
+                            help="Append this run to the benchmark results store, one series per history length")
+    main(arg_parser.parse_args())
@@ -0,0 +1,413 @@
+import argparse
+import asyncio
+import contextlib
+import csv
+import datetime
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+from client_tracing import Tracer, post_otlp_json, write_otlp_json
+from bench_store import DEFAULT_STORE, append_run, new_series
+from latency_histogram import LatencyHistogram
+from streaming_client import HedgePolicy, hedged_completion, stream_completion
+from test_connection import ARTIFACTS_DIR, DEFAULT_MODEL, DEFAULT_PROMPT, H2_STREAMS_PER_CONNECTION
+
+DEFAULT_URL = "http://localhost:4100/agent/api/v1beta/chat/completions"
+STEP_COLUMNS = [
+    "level", "requests", "ok", "errors", "error_rate", "throughput_rps",
+    "p50_s", "p90_s", "p99_s", "max_s", "ttfb_p50_s", "ttfb_p99_s",
+    "ttft_p50_s", "ttft_p99_s", "hedged", "hedge_wins",
+    "sched_lag_p99_s", "pool_wait_p99_s", "loop_lag_p99_s", "client_cpu_pct", "client_saturated",
+]
+# Delay before workers start a step, so every process begins on the same tick
+START_BARRIER_S = 1.0
+# Event-loop lag probe period, and the client health limits past which a step's
+# numbers describe the load generator rather than the service
+LOOP_LAG_INTERVAL_S = 0.02
+CLIENT_MAX_LOOP_LAG_S = 0.05
+CLIENT_MAX_CPU = 0.85
+
+
+def build_payload(prompt, model, stream):
+    return {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "stream": stream,
+    }
+
+
+def default_connections(level, http2=False, mode="concurrency", timeout=None):
+    # HTTP/1.1 needs a socket per in-flight stream; HTTP/2 multiplexes them.
+    # Open-loop load keeps rps x latency requests in flight, which only the
+    # timeout bounds, so an HTTP/1.1 pool sized by the rate alone would queue
+    # requests inside httpx and never offer the intended rate.
+    if http2:
+        return max(1, math.ceil(level / H2_STREAMS_PER_CONNECTION))
+    in_flight = level * timeout if mode == "rps" and timeout else level
+    return max(1, math.ceil(in_flight) + 1)
+
+
+def open_client(level, timeout, http2=False, connections=None):
+    connections = max(1, int(connections or default_connections(level, http2)))
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    return httpx.AsyncClient(timeout=httpx.Timeout(timeout), limits=limits, http1=not http2, http2=http2)
+
+
+def new_step_stats():
+    return {
+        "latency": LatencyHistogram(),
+        "ttfb": LatencyHistogram(),
+        "ttft": LatencyHistogram(),
+        "sched_lag": LatencyHistogram(),
+        # Wait for a pooled connection (or HTTP/2 stream slot) after the request was launched
+        "pool_wait": LatencyHistogram(),
+        "loop_lag": LatencyHistogram(),
+        "requests": 0,
+        "errors": 0,
+        "elapsed": 0.0,
+        "spans": [],
+        "hedged": 0,
+        "hedge_wins": 0,
+        # Successful completions keyed by wall-clock second, for throughput confidence intervals
+        "per_second": {},
+        "cpu_s": 0.0,
+        # Busiest worker's CPU time per wall-clock second; one event loop cannot use more than one core
+        "cpu_util": 0.0,
+    }
+
+
+def merge_step_stats(into, other):
+    for key in ("latency", "ttfb", "ttft", "sched_lag", "pool_wait", "loop_lag"):
+        into[key].merge(other[key])
+    into["requests"] += other["requests"]
+    into["errors"] += other["errors"]
+    into["elapsed"] = max(into["elapsed"], other["elapsed"])
+    into["spans"].extend(other["spans"])
+    into["hedged"] += other["hedged"]
+    into["hedge_wins"] += other["hedge_wins"]
+    for second, count in other["per_second"].items():
+        into["per_second"][second] = into["per_second"].get(second, 0) + count
+    into["cpu_s"] += other["cpu_s"]
+    into["cpu_util"] = max(into["cpu_util"], other["cpu_util"])
+    return into
+
+
+def throughput_samples(stats):
+    # Whole seconds only: the first and last are cut short by the step boundaries
+    seconds = stats["per_second"]
+    if len(seconds) < 3:
+        return []
+    first, last = min(seconds), max(seconds)
+    return [seconds.get(second, 0) for second in range(first + 1, last)]
+
+
+async def send_one(client, url, payload, stats, tracer=None, hedge=None, early_close=False, intended=None):
+    # Latency, TTFB and TTFT run from the intended start when one is given, so a
+    # request held back by a stalled server or a busy event loop is charged for
+    # the wait instead of silently starting late (coordinated omission).
+    started = time.perf_counter()
+    lag = started - intended if intended is not None else 0.0
+    stats["sched_lag"].record(lag)
+    if hedge is not None:
+        result = await hedged_completion(client, payload, hedge, tracer, early_close)
+    else:
+        result = await stream_completion(client, url, payload, tracer, early_close, started=started)
+    latency = time.perf_counter() - started + lag
+
+    stats["requests"] += 1
+    if result["pool_wait"] is not None:
+        stats["pool_wait"].record(result["pool_wait"])
+    if result["error"]:
+        stats["errors"] += 1
+    else:
+        second = int(time.time())
+        stats["per_second"][second] = stats["per_second"].get(second, 0) + 1
+    if result["hedged"]:
+        stats["hedged"] += 1
+        stats["hedge_wins"] += result["hedge_won"]
+    stats["latency"].record(latency)
+    stats["ttfb"].record(result["ttfb"] + lag if result["ttfb"] is not None else latency)
+    stats["ttft"].record(result["ttft"] + lag if result["ttft"] is not None else latency)
+
+
+async def run_concurrency_step(client, url, payload, concurrency, duration, stats, tracer=None, hedge=None,
+                               early_close=False):
+    deadline = time.perf_counter() + duration
+
+    async def virtual_user():
+        while time.perf_counter() < deadline:
+            await send_one(client, url, payload, stats, tracer, hedge, early_close)
+
+    await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+
+
+async def run_rate_step(client, url, payload, rps, duration, stats, tracer=None, hedge=None, early_close=False):
+    # Open loop: request i is due at started + i / rps whether or not earlier
+    # ones have answered; late launches catch up at once and keep their due time
+    tasks = []
+    interval = 1.0 / rps
+    started = time.perf_counter()
+    for i in range(int(rps * duration)):
+        intended = started + i * interval
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send_one(client, url, payload, stats, tracer, hedge, early_close, intended)))
+    await asyncio.gather(*tasks)
+
+
+async def monitor_loop_lag(histogram, interval=LOOP_LAG_INTERVAL_S):
+    # A short timer's oversleep is time the loop spent on other callbacks, and
+    # every response being read waited just as long
+    while True:
+        due = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        histogram.record(max(0.0, time.perf_counter() - due))
+
+
+async def run_worker_step_async(url, payload, mode, level, duration, timeout, start_at, http2=False, connections=None,
+                                trace_sample=0.0, hedge=None, early_close=False):
+    stats = new_step_stats()
+    tracer = Tracer(trace_sample, {"load.mode": mode}) if trace_sample > 0 else None
+    # hedge holds HedgePolicy arguments; each worker learns its own delay and budget
+    hedge_policy = HedgePolicy(**hedge) if hedge else None
+    run_level = run_rate_step if mode == "rps" else run_concurrency_step
+    # Each worker owns its clients, and therefore its own connections. httpcore
+    # packs every HTTP/2 stream onto one connection regardless of the server's
+    # stream limit, so on HTTP/2 the level is split across single-connection clients.
+    if http2:
+        shares = split_level(mode, level, connections or default_connections(level, http2))
+    else:
+        shares = [level]
+    async with contextlib.AsyncExitStack() as stack:
+        clients = [await stack.enter_async_context(
+                       open_client(share, timeout, http2,
+                                   1 if http2 else connections or default_connections(share, http2, mode, timeout)))
+                   for share in shares]
+        await asyncio.sleep(max(0.0, start_at - time.time()))
+        monitor = asyncio.create_task(monitor_loop_lag(stats["loop_lag"]))
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        try:
+            await asyncio.gather(*(run_level(client, url, payload, share, duration, stats, tracer, hedge_policy,
+                                             early_close)
+                                   for client, share in zip(clients, shares)))
+        finally:
+            stats["elapsed"] = time.perf_counter() - started
+            stats["cpu_s"] = time.process_time() - cpu_started
+            stats["cpu_util"] = stats["cpu_s"] / stats["elapsed"] if stats["elapsed"] else 0.0
+            monitor.cancel()
+    if tracer is not None:
+        stats["spans"] = tracer.drain()
+    return stats
+
+
+def run_worker_step(url, payload, mode, level, duration, timeout, start_at, http2=False, connections=None,
+                    trace_sample=0.0, hedge=None, early_close=False):
+    return asyncio.run(run_worker_step_async(url, payload, mode, level, duration, timeout, start_at, http2, connections,
+                                             trace_sample, hedge, early_close))
+
+
+def split_level(mode, level, workers):
+    if mode == "rps":
+        return [level / workers] * workers
+    base, extra = divmod(level, workers)
+    return [base + 1 if i < extra else base for i in range(workers) if base or i < extra]
+
+
+def run_step(pool, args, payload, level):
+    start_at = time.time() + START_BARRIER_S
+    trace_sample = args.trace_sample if args.trace or args.otlp_endpoint else 0.0
+    hedge = {
+        "urls": [args.url] + args.hedge_url,
+        "percentile": args.hedge_percentile,
+        "initial_delay": args.hedge_delay,
+        "budget": args.hedge_budget,
+    } if args.hedge else None
+    shares = split_level(args.mode, level, args.workers)
+    if pool is None:
+        results = [run_worker_step(args.url, payload, args.mode, share, args.hold, args.timeout, start_at,
+                                   args.http2, args.connections, trace_sample, hedge, args.early_close)
+                   for share in shares]
+    else:
+        futures = [pool.submit(run_worker_step, args.url, payload, args.mode, share, args.hold, args.timeout, start_at,
+                               args.http2, args.connections, trace_sample, hedge, args.early_close)
+                   for share in shares]
+        results = [future.result() for future in futures]
+    stats = new_step_stats()
+    for result in results:
+        merge_step_stats(stats, result)
+    return stats
+
+
+def client_saturated(stats, max_loop_lag=CLIENT_MAX_LOOP_LAG_S, max_cpu=CLIENT_MAX_CPU):
+    # A pegged core or a lagging event loop delays sends and response reads alike,
+    # and requests queued in the connection pool never reach the service, so the
+    # step measured the client as much as the service
+    return (stats["cpu_util"] > max_cpu
+            or stats["loop_lag"].percentile(99) > max_loop_lag
+            or stats["sched_lag"].percentile(99) > max_loop_lag
+            or stats["pool_wait"].percentile(99) > max_loop_lag)
+
+
+def summarize(level, stats, max_loop_lag=CLIENT_MAX_LOOP_LAG_S, max_cpu=CLIENT_MAX_CPU):
+    requests_count = stats["requests"]
+    ok = requests_count - stats["errors"]
+    latency, ttfb, ttft = stats["latency"], stats["ttfb"], stats["ttft"]
+    return {
+        "level": level,
+        "requests": requests_count,
+        "ok": ok,
+        "errors": stats["errors"],
+        "error_rate": round(stats["errors"] / requests_count, 4) if requests_count else 0.0,
+        "throughput_rps": round(ok / stats["elapsed"], 3) if stats["elapsed"] else 0.0,
+        "p50_s": round(latency.percentile(50), 4),
+        "p90_s": round(latency.percentile(90), 4),
+        "p99_s": round(latency.percentile(99), 4),
+        "max_s": round(latency.max or 0.0, 4),
+        "ttfb_p50_s": round(ttfb.percentile(50), 4),
+        "ttfb_p99_s": round(ttfb.percentile(99), 4),
+        "ttft_p50_s": round(ttft.percentile(50), 4),
+        "ttft_p99_s": round(ttft.percentile(99), 4),
+        "hedged": stats["hedged"],
+        "hedge_wins": stats["hedge_wins"],
+        "sched_lag_p99_s": round(stats["sched_lag"].percentile(99), 4),
+        "pool_wait_p99_s": round(stats["pool_wait"].percentile(99), 4),
+        "loop_lag_p99_s": round(stats["loop_lag"].percentile(99), 4),
+        "client_cpu_pct": round(stats["cpu_util"] * 100, 1),
+        "client_saturated": "yes" if client_saturated(stats, max_loop_lag, max_cpu) else "no",
+    }
+
+
+def print_row(row):
+    print(" | ".join(f"{row[c]:>{max(len(c), 8)}}" for c in STEP_COLUMNS), flush=True)
+
+
+def export_spans(args, spans):
+    if args.trace:
+        write_otlp_json(args.trace, spans)
+    if args.otlp_endpoint:
+        try:
+            post_otlp_json(args.otlp_endpoint, spans)
+        except httpx.HTTPError as e:
+            print(f"Span export to {args.otlp_endpoint} failed: {e}")
+
+
+def sweep(args):
+    payload = build_payload(args.prompt, args.model, args.stream)
+
+    levels = []
+    level = args.start
+    while level <= args.max:
+        levels.append(level)
+        level += args.step
+        if not args.sweep:
+            break
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.csv)), exist_ok=True)
+    print(f"Generating load from {args.workers} worker process(es) over {'HTTP/2' if args.http2 else 'HTTP/1.1'}")
+    print(" | ".join(f"{c:>{max(len(c), 8)}}" for c in STEP_COLUMNS))
+    rows = []
+    series = []
+    stop_reason = None
+    pool = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    try:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=STEP_COLUMNS)
+            writer.writeheader()
+            for level in levels:
+                stats = run_step(pool, args, payload, level)
+                export_spans(args, stats["spans"])
+                row = summarize(level, stats, args.max_loop_lag, args.max_client_cpu)
+                rows.append(row)
+                series.append(new_series(f"{args.mode} {level}", stats["latency"], throughput_samples(stats)))
+                writer.writerow(row)
+                f.flush()
+                print_row(row)
+                if row["p99_s"] > args.max_p99:
+                    stop_reason = f"p99 {row['p99_s']}s exceeded {args.max_p99}s at {args.mode} {level}"
+                    break
+                if row["error_rate"] > args.max_error_rate:
+                    stop_reason = f"error rate {row['error_rate']} exceeded {args.max_error_rate} at {args.mode} {level}"
+                    break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    healthy = rows[:-1] if stop_reason else rows
+    print()
+    if stop_reason:
+        print(f"Saturation: {stop_reason}")
+    if healthy:
+        best = max(healthy, key=lambda r: r["throughput_rps"])
+        print(f"Knee: last healthy {args.mode} {healthy[-1]['level']}, "
+              f"peak throughput {best['throughput_rps']} rps at {args.mode} {best['level']}")
+    else:
+        print("No healthy step: the first level already crossed a threshold.")
+    saturated = [str(row["level"]) for row in rows if row["client_saturated"] == "yes"]
+    if saturated:
+        print(f"Client saturated at {args.mode} {', '.join(saturated)}: those rows are bounded by the load generator, "
+              f"not the service; add --workers or treat them as lower bounds")
+    print(f"Per-step results saved to: {args.csv}")
+    if args.trace:
+        print(f"Client spans (OTLP/JSON) appended to: {args.trace}")
+    if args.store and series:
+        config = {key: getattr(args, key) for key in ("url", "model", "stream", "mode", "http2", "workers", "hold",
+                                                       "early_close", "hedge")}
+        record = append_run(f"load_{args.mode}", series, config, args.store)
+        print(f"Run {record['run_id']} recorded in {args.store}; compare with: bench_store.py compare {record['run_id']}")
+    return rows
+
+
+if __name__ == "__main__":
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    arg_parser = argparse.ArgumentParser(description="Load generator and saturation sweep for the agent team API")
+    arg_parser.add_argument("--url", default=DEFAULT_URL)
+    arg_parser.add_argument("--model", default=DEFAULT_MODEL)
+    arg_parser.add_argument("--prompt", default=DEFAULT_PROMPT)
+    arg_parser.add_argument("--stream", action="store_true", help="Request SSE streaming completions")
+    arg_parser.add_argument("--early-close", action="store_true",
+                            help="Close each stream as soon as a TERMINATE delta or finish_reason stop arrives")
+    arg_parser.add_argument("--hedge", action="store_true",
+                            help="Duplicate requests with no answer token after a percentile-derived delay")
+    arg_parser.add_argument("--hedge-url", action="append", default=[],
+                            help="Replica endpoint for duplicates (repeatable); defaults to --url via the load balancer")
+    arg_parser.add_argument("--hedge-percentile", type=float, default=95.0,
+                            help="Hedge once the wait exceeds this percentile of recent first-answer times")
+    arg_parser.add_argument("--hedge-delay", type=float, default=5.0, help="Hedge delay (s) until enough samples exist")
+    arg_parser.add_argument("--hedge-budget", type=float, default=0.1, help="Maximum fraction of requests duplicated")
+    arg_parser.add_argument("--mode", choices=["concurrency", "rps"], default="concurrency",
+                            help="Offer load as concurrent virtual users (closed loop) or as an open-loop request rate "
+                                 "measured from each request's intended start")
+    arg_parser.add_argument("--http2", action="store_true",
+                            help="Multiplex requests over HTTP/2 (h2c with prior knowledge for http:// URLs)")
+    arg_parser.add_argument("--connections", type=int,
+                            help="Connections per worker (default: one per virtual user on HTTP/1.1, "
+                                 "rps x timeout in rps mode, "
+                                 f"one per {H2_STREAMS_PER_CONNECTION} streams on HTTP/2)")
+    arg_parser.add_argument("--workers", type=int, default=1,
+                            help="Worker processes to shard virtual users across (1 runs in-process)")
+    arg_parser.add_argument("--sweep", action="store_true", help="Step the load level upward until saturation")
+    arg_parser.add_argument("--start", type=int, default=1, help="First (or only) load level")
+    arg_parser.add_argument("--step", type=int, default=2, help="Load level increment per sweep step")
+    arg_parser.add_argument("--max", type=int, default=64, help="Highest load level to try")
+    arg_parser.add_argument("--hold", type=float, default=30.0, help="Seconds to hold each step")
+    arg_parser.add_argument("--max-p99", type=float, default=60.0, help="Stop once p99 latency (s) exceeds this")
+    arg_parser.add_argument("--max-error-rate", type=float, default=0.05, help="Stop once the error rate exceeds this")
+    arg_parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    arg_parser.add_argument("--max-loop-lag", type=float, default=CLIENT_MAX_LOOP_LAG_S,
+                            help="Flag the client as saturated once event-loop, schedule or pool wait p99 (s) exceeds this")
+    arg_parser.add_argument("--max-client-cpu", type=float, default=CLIENT_MAX_CPU,
+                            help="Flag the client as saturated once a worker uses this fraction of a core")
+    arg_parser.add_argument("--csv", default=os.path.join(ARTIFACTS_DIR, f"load_sweep_{timestamp}.csv"))
+    arg_parser.add_argument("--trace", nargs="?", const=os.path.join(ARTIFACTS_DIR, f"client_spans_{timestamp}.jsonl"),
+                            help="Send a W3C traceparent per request and append client spans as OTLP/JSON lines")
+    arg_parser.add_argument("--trace-sample", type=float, default=1.0, help="Fraction of requests whose spans are kept")
+    arg_parser.add_argument("--store", nargs="?", const=DEFAULT_STORE,
+                            help="Append this run (keyed by git commit) to the benchmark results store")
+    arg_parser.add_argument("--otlp-endpoint", help="Also POST spans to an OTLP/HTTP receiver, e.g. http://localhost:4318/v1/traces")
+    sweep(arg_parser.parse_args())
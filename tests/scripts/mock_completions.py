@@ -0,0 +1,138 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Stand-in for POST /agent/api/v1beta/chat/completions, shaped like route_query's
+# output: <think> progress events, answer tokens ending in TERMINATE, then [DONE].
+# The failure modes the load tools must notice are selectable, so their numbers
+# can be reproduced without an LLM behind the service.
+PROGRESS = [("planner", "plan"), ("searcher", "search")]
+ANSWER = ["Hello", " world", " TERMINATE"]
+
+
+def sse_chunk(delta, finish_reason=None):
+    chunk = {"object": "chat.completion.chunk", "choices": [{"delta": delta, "index": 0, "finish_reason": finish_reason}]}
+    data = f"data: {json.dumps(chunk, separators=(',', ':'))}\n\n".encode()
+    return b"%x\r\n%s\r\n" % (len(data), data)
+
+
+def sse_raw(data):
+    return b"%x\r\n%s\r\n" % (len(data), data)
+
+
+class CompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    active = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        size = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(size))
+        with self.lock:
+            CompletionHandler.active += 1
+            active = CompletionHandler.active
+        try:
+            self.respond(body, size, active)
+        except (BrokenPipeError, ConnectionResetError):
+            # Early-closed and cancelled (hedged) requests land here
+            pass
+        finally:
+            with self.lock:
+                CompletionHandler.active -= 1
+
+    def respond(self, body, size, active):
+        args = self.server.args
+        if args.max_active and active > args.max_active:
+            time.sleep(args.reject_time)
+            return self.send_json(503, {"error": "overloaded"})
+        # Service time stretches once more requests are in flight than --capacity
+        service = args.service_time + size / 1024 * args.per_kb
+        if args.capacity:
+            service *= max(1.0, active / args.capacity)
+        if args.slow_rate and random.random() < args.slow_rate:
+            service += args.slow_time
+        time.sleep(args.header_delay)
+
+        if not body.get("stream"):
+            time.sleep(service)
+            message = {"role": "assistant", "content": "".join(ANSWER)}
+            return self.send_json(200, {"choices": [{"index": 0, "message": message, "finish_reason": "stop"}]})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        if args.mode == "done-only":
+            # What route_query sends when run_stream fails to start
+            return self.finish_stream()
+        for stage, message in PROGRESS:
+            self.send_chunk(sse_chunk({"content": f"<think>[{stage}] {message}</think>\n",
+                                       "reasoning_content": f"[{stage}] {message}\n"}))
+        time.sleep(service)
+        for token in ANSWER:
+            if args.malformed_rate and random.random() < args.malformed_rate:
+                self.send_chunk(sse_raw(b"data: <html>502 Bad Gateway</html>\n\n"))
+            finish_reason = "stop" if "TERMINATE" in token else None
+            if args.mode == "truncated" and finish_reason:
+                # Connection dropped mid-answer: no finish_reason, no [DONE]
+                return self.send_chunk(b"0\r\n\r\n")
+            self.send_chunk(sse_chunk({"content": token}, finish_reason))
+            time.sleep(args.token_interval)
+        time.sleep(args.trailing_time)
+        self.finish_stream()
+
+    def send_chunk(self, data):
+        self.wfile.write(data)
+        self.wfile.flush()
+
+    def finish_stream(self):
+        self.send_chunk(sse_raw(b"data: [DONE]\n\n") + b"0\r\n\r\n")
+
+    def send_json(self, status, payload):
+        out = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+def make_server(args):
+    server = ThreadingHTTPServer((args.host, args.port), CompletionHandler)
+    server.daemon_threads = True
+    server.args = args
+    return server
+
+
+def build_parser():
+    arg_parser = argparse.ArgumentParser(description="Mock chat completions server for the load tools")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=18080)
+    arg_parser.add_argument("--mode", choices=["ok", "done-only", "truncated"], default="ok",
+                            help="done-only: a lone [DONE]; truncated: EOF before finish_reason and [DONE]")
+    arg_parser.add_argument("--service-time", type=float, default=0.05, help="Seconds before the answer starts")
+    arg_parser.add_argument("--per-kb", type=float, default=0.0, help="Extra service seconds per KB of request body")
+    arg_parser.add_argument("--capacity", type=int, default=0,
+                            help="In-flight requests served at full speed; beyond it service time scales up")
+    arg_parser.add_argument("--max-active", type=int, default=0, help="Answer 503 above this many in-flight requests")
+    arg_parser.add_argument("--reject-time", type=float, default=0.02, help="Seconds a 503 takes")
+    arg_parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of requests that stall")
+    arg_parser.add_argument("--slow-time", type=float, default=3.0, help="Extra seconds a stalled request takes")
+    arg_parser.add_argument("--header-delay", type=float, default=0.0, help="Seconds before response headers")
+    arg_parser.add_argument("--token-interval", type=float, default=0.01, help="Seconds between answer tokens")
+    arg_parser.add_argument("--trailing-time", type=float, default=0.0, help="Seconds between TERMINATE and [DONE]")
+    arg_parser.add_argument("--malformed-rate", type=float, default=0.0,
+                            help="Chance of a non-JSON data: line before each answer token")
+    return arg_parser
+
+
+if __name__ == "__main__":
+    parsed = build_parser().parse_args()
+    print(f"Mock completions on http://{parsed.host}:{parsed.port} (mode {parsed.mode})")
+    make_server(parsed).serve_forever()
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def _normalize_text(text):
+    # Collapse whitespace so prompts that only differ in spacing share an entry
+    return " ".join(text.split())
+
+
+def normalize_messages(messages):
+    normalized = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            content = _normalize_text(content)
+        elif isinstance(content, list):
+            parts = []
+            for part in content:
+                if part.get("type") == "text":
+                    part = {"type": "text", "text": _normalize_text(part.get("text", ""))}
+                parts.append(part)
+            content = parts
+        entry = {"role": message.get("role", "").strip().lower(), "content": content}
+        if message.get("name"):
+            entry["name"] = message["name"]
+        normalized.append(entry)
+    return normalized
+
+
+def cache_key(url, model, messages):
+    # The endpoint is part of the key: one shared cache file must never answer
+    # for a different deployment or replica than the one that produced the entry
+    payload = json.dumps(
+        {"url": url.strip().rstrip("/"), "model": model.strip(), "messages": normalize_messages(messages)},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path=None, max_entries=1024, ttl=7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, stored_at REAL NOT NULL, "
+                "accessed_at REAL NOT NULL, response TEXT NOT NULL)"
+            )
+            self._load()
+
+    def _load(self):
+        now = time.time()
+        self._db.execute("DELETE FROM responses WHERE stored_at < ?", (now - self.ttl,))
+        rows = self._db.execute(
+            "SELECT key, stored_at, response FROM responses ORDER BY accessed_at DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        # Rows come most-recent first; insert oldest first so LRU order is preserved
+        for key, stored_at, response in reversed(rows):
+            self._entries[key] = (stored_at, json.loads(response))
+        if rows:
+            self._db.execute(
+                "DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+        self._db.commit()
+
+    def get(self, url, model, messages):
+        key = cache_key(url, model, messages)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, response = entry
+            if now - stored_at > self.ttl:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                if self._db:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if self._db:
+                self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._db.commit()
+            return response
+
+    def put(self, url, model, messages, response):
+        key = cache_key(url, model, messages)
+        now = time.time()
+        with self._lock:
+            self._entries[key] = (now, response)
+            self._entries.move_to_end(key)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                evicted.append((old_key,))
+                self.evictions += 1
+            if self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, stored_at, accessed_at, response) VALUES (?, ?, ?, ?)",
+                    (key, now, now, json.dumps(response)),
+                )
+                if evicted:
+                    self._db.executemany("DELETE FROM responses WHERE key = ?", evicted)
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,124 @@
+import json
+from json.decoder import WHITESPACE
+
+DONE = object()
+
+_DATA_FIELD = b"data:"
+_DELTA_KEY = b'"delta":'
+_FINISH_KEY = b'"finish_reason":'
+_decoder = json.JSONDecoder()
+
+
+class SSEParser:
+    # Incremental parser for chat.completion.chunk streams. Bytes are appended to
+    # one reusable buffer and events are located with in-place searches; only the
+    # choices[0].delta object (and finish_reason) of each chunk is JSON-decoded.
+    __slots__ = ("_buf", "_crlf")
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._crlf = False
+
+    def feed(self, data):
+        buf = self._buf
+        buf += data
+        if not self._crlf and b"\r" in data:
+            self._crlf = True
+        events = []
+        start = 0
+        view = memoryview(buf)
+        try:
+            while True:
+                end, sep_len = self._find_boundary(buf, start)
+                if end < 0:
+                    break
+                event = self._parse_event(buf, view, start, end)
+                if event is not None:
+                    events.append(event)
+                start = end + sep_len
+        finally:
+            view.release()
+        if start:
+            # Compact once per feed instead of once per event
+            del buf[:start]
+        return events
+
+    def _find_boundary(self, buf, start):
+        end = buf.find(b"\n\n", start)
+        if not self._crlf:
+            return end, 2
+        crlf_end = buf.find(b"\r\n\r\n", start)
+        if crlf_end >= 0 and (end < 0 or crlf_end < end):
+            return crlf_end, 4
+        return end, 2
+
+    def _parse_event(self, buf, view, start, end):
+        data_start = -1
+        data_end = -1
+        extra_lines = None
+        pos = start
+        while pos < end:
+            newline = buf.find(b"\n", pos, end)
+            if newline < 0:
+                newline = end
+            line_end = newline
+            if self._crlf and line_end > pos and buf[line_end - 1] == 13:
+                line_end -= 1
+            # Comments (": keep-alive") and non-data fields are skipped
+            if buf.startswith(_DATA_FIELD, pos, line_end):
+                value_start = pos + len(_DATA_FIELD)
+                if value_start < line_end and buf[value_start] == 32:
+                    value_start += 1
+                if data_start < 0:
+                    data_start, data_end = value_start, line_end
+                else:
+                    if extra_lines is None:
+                        extra_lines = [view[data_start:data_end].tobytes()]
+                    extra_lines.append(view[value_start:line_end].tobytes())
+            pos = newline + 1
+
+        if data_start < 0:
+            return None
+        if extra_lines is not None:
+            payload = b"\n".join(extra_lines)
+            return _decode_payload(payload, memoryview(payload), 0, len(payload))
+        return _decode_payload(buf, view, data_start, data_end)
+
+
+def _decode_payload(buf, view, start, end):
+    if end - start == 6 and view[start:end] == b"[DONE]":
+        return DONE
+
+    delta_at = buf.find(_DELTA_KEY, start, end)
+    if delta_at < 0:
+        chunk = json.loads(str(view[start:end], "utf-8"))
+        choice = (chunk.get("choices") or [{}])[0]
+        return choice.get("delta") or {}, choice.get("finish_reason")
+
+    finish_at = buf.find(_FINISH_KEY, start, end)
+    delta_start = delta_at + len(_DELTA_KEY)
+    delta_end = finish_at if finish_at > delta_start else end
+    text = str(view[delta_start:delta_end], "utf-8")
+    delta, _ = _decoder.raw_decode(text, WHITESPACE.match(text, 0).end())
+
+    finish_reason = None
+    if finish_at >= 0:
+        value_start = finish_at + len(_FINISH_KEY)
+        while value_start < end and buf[value_start] in b" \t":
+            value_start += 1
+        if not buf.startswith(b"null", value_start, end):
+            finish_reason, _ = _decoder.raw_decode(str(view[value_start:end], "utf-8"))
+    return delta, finish_reason
+
+
+async def aiter_sse_events(response):
+    parser = SSEParser()
+    async for chunk in response.aiter_bytes():
+        for event in parser.feed(chunk):
+            yield event
+
+
+def iter_sse_events(chunks):
+    parser = SSEParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
@@ -0,0 +1,277 @@
+import asyncio
+import collections
+import contextlib
+import itertools
+import json
+import math
+import re
+import time
+
+import httpx
+
+from client_tracing import progress_stage
+from sse_parser import DONE, SSEParser
+from test_connection import HEADERS
+
+TERMINATE = "TERMINATE"
+# Once parsing has stopped, the stream's end is still spotted in the raw bytes
+_STREAM_END = re.compile(rb'data: ?\[DONE\]|"finish_reason": ?"')
+_STREAM_END_OVERLAP = 32
+
+
+def new_result(url):
+    return {
+        "url": url,
+        "status_code": None,
+        "error": None,
+        "ttfb": None,
+        "ttft": None,
+        "first_answer": None,
+        "end_reason": None,
+        "content": [],
+        "hedged": False,
+        "hedge_won": False,
+        "request_bytes": 0,
+        "response_bytes": 0,
+        "pool_wait": None,
+    }
+
+
+def pool_wait(marks, entered):
+    # Time from the call until the request headers could be written, less any
+    # connect/TLS handshake: queueing for a pooled connection or an HTTP/2 stream slot
+    sent = marks.get("send_request_headers.started")
+    if sent is None:
+        return None
+    connect_started = marks.get("connect_tcp.started")
+    connected = marks.get("start_tls.complete") or marks.get("connect_tcp.complete")
+    connect = connected - connect_started if connect_started is not None and connected is not None else 0.0
+    return max(0.0, sent - entered - connect)
+
+
+def request_wire_bytes(request):
+    # Request line, headers and body as sent over HTTP/1.1 (HPACK makes HTTP/2 headers smaller)
+    target = request.url.raw_path.decode("ascii")
+    head = len(f"{request.method} {target} HTTP/1.1\r\n") + 2
+    head += sum(len(name) + len(value) + 4 for name, value in request.headers.raw)
+    return head + len(request.content)
+
+
+async def stream_completion(client, url, payload, tracer=None, early_close=False, first_answer=None,
+                            collect_content=False, started=None):
+    # One POST, read as SSE when streaming. Timings are seconds from `started`
+    # (defaults to now), so hedged attempts can share the caller's clock.
+    # ttft and first_answer are the first non-progress token (or the first byte of
+    # a non-streaming response); early_close drops the connection as soon as
+    # the answer ends with TERMINATE / finish_reason "stop" instead of waiting
+    # for [DONE] and the server's trailing work.
+    entered = time.perf_counter()
+    started = entered if started is None else started
+    trace = tracer.start("POST chat.completions", **{"url.full": url, "gen_ai.request.model": payload["model"]}) \
+        if tracer is not None else None
+    traced = trace is not None and trace.sampled
+    # Without a consumer for later events, parsing stops at the first token
+    follow = traced or early_close or first_answer is not None or collect_content
+    result = new_result(url)
+    marks = {}
+
+    async def on_httpx_event(event_name, info):
+        marks.setdefault(event_name.split(".", 1)[1], time.perf_counter())
+        if traced:
+            trace.on_httpx_event(event_name, info)
+
+    # Built up front so its size is known even when no response ever arrives
+    request = client.build_request("POST", url, json=payload,
+                                   headers=trace.headers(HEADERS) if trace is not None else HEADERS,
+                                   extensions={"trace": on_httpx_event})
+    try:
+        async with contextlib.aclosing(await client.send(request, stream=True)) as response:
+            result["status_code"] = response.status_code
+            result["pool_wait"] = pool_wait(marks, entered)
+            parser = SSEParser() if payload["stream"] and response.status_code < 400 else None
+            body = [] if parser is None and collect_content and response.status_code < 400 else None
+            tail = b""
+            async for chunk in response.aiter_bytes():
+                if result["ttfb"] is None:
+                    result["ttfb"] = time.perf_counter() - started
+                    if traced:
+                        trace.mark("first_byte")
+                    if parser is None and response.status_code < 400:
+                        result["ttft"] = result["first_answer"] = result["ttfb"]
+                        if first_answer is not None:
+                            first_answer.set()
+                if body is not None:
+                    body.append(chunk)
+                if parser is None:
+                    continue
+                # Progress events come first, so parsing runs at least until the answer starts
+                if not (follow or result["first_answer"] is None):
+                    if result["end_reason"] is None:
+                        window = tail + chunk
+                        if _STREAM_END.search(window):
+                            result["end_reason"] = "done"
+                        tail = window[-_STREAM_END_OVERLAP:]
+                    continue
+                if _consume(parser.feed(chunk), result, trace if traced else None, early_close, first_answer,
+                            collect_content, started):
+                    break
+                tail = chunk[-_STREAM_END_OVERLAP:]
+            else:
+                # A 200 stream that ends without an answer (route_query answers a
+                # failed stream setup with a lone [DONE]) or without [DONE] and a
+                # finish_reason is a failed request, not a fast one
+                if parser is not None and result["first_answer"] is None:
+                    result["error"] = "empty stream"
+                elif parser is not None and result["end_reason"] is None:
+                    result["error"] = "truncated stream"
+            result["response_bytes"] = response.num_bytes_downloaded
+            if body:
+                try:
+                    message = json.loads(b"".join(body))["choices"][0]["message"]
+                except (ValueError, LookupError, TypeError):
+                    result["error"] = "invalid response body"
+                else:
+                    if message.get("content"):
+                        result["content"].append(message["content"])
+            if response.status_code >= 400:
+                result["error"] = f"HTTP {response.status_code}"
+    except httpx.TimeoutException:
+        result["error"] = "timeout"
+    except httpx.HTTPError as e:
+        result["error"] = type(e).__name__
+    except ValueError:
+        # A proxy or error page answering with non-JSON data: lines fails this request only
+        result["error"] = "invalid stream data"
+    except asyncio.CancelledError:
+        result["error"] = "cancelled"
+        raise
+    finally:
+        # Anything that got past connect put its request on the wire, answered or not
+        if "send_request_headers.started" in marks:
+            result["request_bytes"] = request_wire_bytes(request)
+        if trace is not None:
+            trace.finish(result["status_code"], result["error"], **{"stream.early_close": result["end_reason"] == "early"})
+    return result
+
+
+def _consume(events, result, trace, early_close, first_answer, collect_content, started):
+    # Returns True once the caller should stop reading the stream
+    for event in events:
+        if trace is not None:
+            trace.observe(event)
+        if event is DONE:
+            result["end_reason"] = result["end_reason"] or "done"
+            return False
+        delta, finish_reason = event
+        content = delta.get("content")
+        if content:
+            now = time.perf_counter() - started
+            # <think>[stage] ...</think> progress arrives as content straight
+            # away; time to first token means the first answer token
+            if result["first_answer"] is None and progress_stage(delta) is None:
+                result["ttft"] = result["first_answer"] = now
+                if first_answer is not None:
+                    first_answer.set()
+            if collect_content:
+                result["content"].append(content)
+        if finish_reason:
+            result["end_reason"] = finish_reason
+        if early_close and (finish_reason == "stop" or (content and TERMINATE in content)):
+            result["end_reason"] = "early"
+            return True
+    return False
+
+
+class HedgePolicy:
+    # Hedge a request once it has gone longer without an answer token than the
+    # given percentile of recent first-answer times. Duplicates are capped at
+    # `budget` of all requests, so a slow backend cannot double the offered load.
+    def __init__(self, urls, percentile=95.0, initial_delay=5.0, min_samples=20, budget=0.1, window=1000):
+        self.urls = list(urls)
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.budget = budget
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._samples = collections.deque(maxlen=window)
+        self._primary = itertools.cycle(range(len(self.urls)))
+
+    def delay(self):
+        if len(self._samples) < self.min_samples:
+            return self.initial_delay
+        ordered = sorted(self._samples)
+        return ordered[max(0, math.ceil(self.percentile / 100.0 * len(ordered)) - 1)]
+
+    def observe(self, seconds):
+        self._samples.append(seconds)
+
+    def allow(self):
+        return self.hedges + 1 <= self.budget * self.requests
+
+    def pick_urls(self):
+        # With one URL the duplicate goes back through the load balancer
+        index = next(self._primary)
+        return self.urls[index], self.urls[(index + 1) % len(self.urls)]
+
+
+async def hedged_completion(client, payload, policy, tracer=None, early_close=False, collect_content=False):
+    policy.requests += 1
+    primary_url, hedge_url = policy.pick_urls()
+    started = time.perf_counter()
+    attempts = []
+
+    def launch(url):
+        ready = asyncio.Event()
+        task = asyncio.create_task(stream_completion(client, url, payload, tracer, early_close, ready,
+                                                     collect_content, started))
+        attempts.append((task, ready))
+
+    launch(primary_url)
+    winner = await _await_winner(attempts, policy.delay() if policy.allow() else None)
+    if winner is None:
+        policy.hedges += 1
+        launch(hedge_url)
+        winner = await _await_winner(attempts, None)
+
+    # Losing attempts are cancelled mid-stream; leaving `async with` on the response
+    # closes their connection (HTTP/1.1) or resets their stream (HTTP/2)
+    losers = [task for task, _ in attempts if task is not winner]
+    for task in losers:
+        task.cancel()
+    result = await winner
+    await asyncio.gather(*losers, return_exceptions=True)
+
+    result["hedged"] = len(attempts) > 1
+    result["hedge_won"] = result["hedged"] and winner is attempts[1][0]
+    if result["hedge_won"]:
+        policy.hedge_wins += 1
+    if result["first_answer"] is not None:
+        policy.observe(result["first_answer"])
+    return result
+
+
+async def _await_winner(attempts, timeout):
+    # The first attempt to stream an answer token, or to finish without error,
+    # wins. Failed attempts drop out while another is still running. Returns
+    # None when `timeout` elapses first.
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    while True:
+        for task, ready in attempts:
+            if ready.is_set() or (task.done() and not task.result()["error"]):
+                return task
+        running = [(task, ready) for task, ready in attempts if not task.done()]
+        if not running:
+            return attempts[-1][0]
+        remaining = None if deadline is None else deadline - loop.time()
+        if remaining is not None and remaining <= 0:
+            return None
+        waiters = [asyncio.create_task(ready.wait()) for _, ready in running]
+        done, _ = await asyncio.wait(waiters + [task for task, _ in running], timeout=remaining,
+                                     return_when=asyncio.FIRST_COMPLETED)
+        for waiter in waiters:
+            waiter.cancel()
+        if not done:
+            return None
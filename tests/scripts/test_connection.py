@@ -1,47 +1,293 @@
 import requests
+import httpx
+import argparse
+import contextlib
+import datetime
+import itertools
 import json
+import math
 import os
 import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-def send_agent_team_request(prompt="que es el mlops y como se defien un proyecto por pasos", model="internal-gpt4_v0.1"):
-    url = "http://10.152.183.237/v1/chat/completions"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": "Bearer sk-1234"
-    }
-    
-    data = {
+from adaptive_concurrency import AIMDLimiter, ThroughputTimeline
+from client_tracing import Tracer, post_otlp_json, write_otlp_json
+from response_cache import ResponseCache
+
+DEFAULT_PROMPT = "que es el mlops y como se defien un proyecto por pasos"
+DEFAULT_MODEL = "internal-gpt4_v0.1"
+API_URL = "http://10.152.183.237/v1/chat/completions"
+HEADERS = {
+    "Content-Type": "application/json",
+    "Authorization": "Bearer sk-1234"
+}
+# Concurrent streams a server typically allows per HTTP/2 connection
+H2_STREAMS_PER_CONNECTION = 100
+ARTIFACTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), ".artifacts")
+
+
+def build_payload(prompt, model):
+    return {
         "model": model,
         "messages": [{"role": "user", "content": prompt}],
         "stream": False
     }
-    
+
+
+def open_http2_client(timeout=300):
+    # HTTP/2 only: h2c with prior knowledge on http:// URLs, ALPN on https://.
+    # One client is one connection; in-flight completions are multiplexed on it
+    # as streams instead of holding a socket each.
+    limits = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+    return httpx.Client(http1=False, http2=True, timeout=timeout, limits=limits)
+
+
+def post_chat_completion(data, url=API_URL, session=None, timeout=300, tracer=None):
+    http = session if session is not None else requests
+    trace = tracer.start("POST chat.completions", **{"url.full": url, "gen_ai.request.model": data["model"]}) \
+        if tracer is not None else None
+    headers = trace.headers(HEADERS) if trace is not None else HEADERS
+    extensions = {"extensions": trace.httpx_extensions()} if trace is not None and isinstance(http, httpx.Client) else {}
+    status_code = None
+    error = None
+    try:
+        response = http.post(url, headers=headers, json=data, timeout=timeout, **extensions)
+        status_code = response.status_code
+        if trace is not None:
+            if isinstance(response, requests.Response):
+                # requests exposes no connection events; elapsed runs from sending until the headers are parsed
+                trace.mark("send_request_body.complete", trace.start_ns)
+                trace.mark("receive_response_headers.complete", trace.start_ns + int(response.elapsed.total_seconds() * 1e9))
+            trace.mark("first_byte", trace.marks.get("receive_response_headers.complete"))
+        try:
+            response.raise_for_status()
+        except (requests.HTTPError, httpx.HTTPStatusError) as e:
+            raise requests.HTTPError(f"{e}: {response.text[:500]}", response=response) from None
+        return response.json()
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        if trace is not None:
+            trace.finish(status_code, error)
+
+
+def send_agent_team_request(prompt=DEFAULT_PROMPT, model=DEFAULT_MODEL, cache=None, url=API_URL, session=None,
+                            tracer=None):
+    data = build_payload(prompt, model)
+
+    if cache is not None:
+        cached = cache.get(url, model, data["messages"])
+        if cached is not None:
+            print(f"Cache hit for model {model} at {url}, skipping request.")
+            return cached
+
     print(f"Sending request to {url} with model {model}...")
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=300)
-        response.raise_for_status()
-        result = response.json()
+        result = post_chat_completion(data, url=url, session=session, tracer=tracer)
+        if cache is not None:
+            cache.put(url, model, data["messages"], result)
         return result
     except Exception as e:
         print(f"Error: {e}")
-        if 'response' in locals():
-            print(f"Response content: {response.text}")
         return None
 
+
+def iter_prompts(source):
+    # Lazily yield (item, error) pairs so arbitrarily large batches never sit in memory.
+    # Unusable lines come with an error instead of an item, so one bad line fails only
+    # itself; valid items pass through untouched, whatever keys they carry.
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    with contextlib.nullcontext(stream) if source == "-" else stream:
+        for line_no, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                yield {"id": line_no}, f"invalid JSON on line {line_no}"
+                continue
+            if isinstance(item, str):
+                item = {"prompt": item}
+            if not isinstance(item, dict) or not isinstance(item.get("prompt"), str):
+                yield {"id": item.get("id", line_no) if isinstance(item, dict) else line_no}, \
+                    f"missing prompt on line {line_no}"
+                continue
+            item.setdefault("id", line_no)
+            yield item, None
+
+
+def is_overload(error):
+    # Failures that say the deployment is saturated, as opposed to a bad prompt
+    if isinstance(error, (requests.Timeout, requests.ConnectionError, httpx.TransportError)):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return status is not None and (status >= 500 or status == 429)
+
+
+def run_batch(prompts, output_path, concurrency=8, model=DEFAULT_MODEL, cache=None, url=API_URL, http2=False,
+              tracer=None, limiter=None, timeline=None):
+    local = threading.local()
+    # With a limiter, concurrency only sizes the thread pool; the limiter decides how many run
+    max_workers = limiter.max_limit if limiter is not None else concurrency
+    # HTTP/1.1 keeps a session per thread. On HTTP/2 threads are bound round-robin
+    # to a few shared connections, each kept under the server's stream limit.
+    h2_clients = [open_http2_client() for _ in range(math.ceil(max_workers / H2_STREAMS_PER_CONNECTION))] if http2 else []
+    assigned = itertools.count()
+
+    def run_one(item):
+        session = getattr(local, "session", None)
+        if session is None:
+            if h2_clients:
+                session = local.session = h2_clients[next(assigned) % len(h2_clients)]
+            else:
+                session = local.session = requests.Session()
+        item_model = item.get("model", model)
+        data = build_payload(item["prompt"], item_model)
+        record = {"id": item["id"], "model": item_model, "prompt": item["prompt"], "cached": False}
+        started = time.perf_counter()
+        epoch = limiter.start() if limiter is not None else None
+        try:
+            result = cache.get(url, item_model, data["messages"]) if cache is not None else None
+            if result is not None:
+                record["cached"] = True
+            else:
+                result = post_chat_completion(data, url=url, session=session, tracer=tracer)
+                if limiter is not None:
+                    limiter.on_success(epoch, time.perf_counter() - started)
+                if cache is not None:
+                    cache.put(url, item_model, data["messages"], result)
+            record["ok"] = True
+            record["content"] = result["choices"][0]["message"]["content"]
+            record["response"] = result
+        except Exception as e:
+            record["ok"] = False
+            record["error"] = str(e)
+            if limiter is not None and is_overload(e):
+                limiter.on_overload(epoch)
+        record["latency_s"] = round(time.perf_counter() - started, 4)
+        return record
+
+    counts = {"ok": 0, "failed": 0}
+    current_limit = (lambda: limiter.current) if limiter is not None else (lambda: concurrency)
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        def write(record, sent=True):
+            counts["ok" if record["ok"] else "failed"] += 1
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if timeline is not None and sent:
+                timeline.record(record["ok"], record["latency_s"])
+
+        def report(force=False):
+            row = timeline.tick(current_limit(), len(in_flight), force) if timeline is not None else None
+            if row is not None:
+                print(f"[{row['elapsed_s']:>7}s] limit {row['limit']:>3}, in flight {row['in_flight']:>3}, "
+                      f"{row['throughput_rps']} req/s, p95 {row['p95_s']}s, {row['errors']} errors", flush=True)
+
+        in_flight = set()
+        for item, error in prompts:
+            if error is not None:
+                write({"id": item["id"], "ok": False, "error": error, "latency_s": 0.0}, sent=False)
+                continue
+            # The limit can drop below what is already running; drain until back under it
+            while len(in_flight) >= current_limit():
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    write(future.result())
+                report()
+            in_flight.add(pool.submit(run_one, item))
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                write(future.result())
+            report()
+        report(force=True)
+    for client in h2_clients:
+        client.close()
+    return counts
+
 if __name__ == "__main__":
-    prompt = "que es el mlops y como se defien un proyecto por pasos"
-    if len(sys.argv) > 1:
-        prompt = sys.argv[1]
-    
-    result = send_agent_team_request(prompt)
+    arg_parser = argparse.ArgumentParser(description="Agent team connection test client")
+    arg_parser.add_argument("prompt", nargs="?", default=DEFAULT_PROMPT)
+    arg_parser.add_argument("--cache", nargs="?", const=os.path.join(ARTIFACTS_DIR, "response_cache.sqlite"),
+                            help="Enable the client-side response cache, optionally at the given sqlite path")
+    arg_parser.add_argument("--cache-size", type=int, default=1024, help="Maximum cached responses (LRU)")
+    arg_parser.add_argument("--cache-ttl", type=float, default=7 * 24 * 3600, help="Cache entry lifetime in seconds")
+    arg_parser.add_argument("--url", default=API_URL, help="Chat completions endpoint")
+    arg_parser.add_argument("--model", default=DEFAULT_MODEL)
+    arg_parser.add_argument("--batch", metavar="JSONL", help="Run every prompt of a JSONL file ('-' for stdin)")
+    arg_parser.add_argument("--concurrency", type=int, default=8, help="Requests kept in flight in batch mode")
+    arg_parser.add_argument("--output", help="JSONL results file for batch mode (appended to)")
+    arg_parser.add_argument("--adaptive", action="store_true",
+                            help="Adapt batch concurrency (AIMD) to latency and errors, starting from --concurrency")
+    arg_parser.add_argument("--max-concurrency", type=int, default=64, help="Upper bound for --adaptive")
+    arg_parser.add_argument("--report-interval", type=float, default=10.0,
+                            help="Seconds between batch throughput reports")
+    arg_parser.add_argument("--http2", action="store_true",
+                            help="Use HTTP/2 (h2c for http:// URLs) and multiplex requests over shared connections")
+    arg_parser.add_argument("--trace", nargs="?", const=os.path.join(ARTIFACTS_DIR, "client_spans.jsonl"),
+                            help="Send a W3C traceparent per request and append client spans as OTLP/JSON lines")
+    arg_parser.add_argument("--otlp-endpoint", help="Also POST spans to an OTLP/HTTP receiver, e.g. http://localhost:4318/v1/traces")
+    args = arg_parser.parse_args()
+
+    tracer = Tracer() if args.trace or args.otlp_endpoint else None
+
+    def export_spans():
+        if tracer is None:
+            return
+        spans = tracer.drain()
+        if args.trace:
+            write_otlp_json(args.trace, spans)
+            print(f"Client spans (OTLP/JSON) appended to: {args.trace}")
+        if args.otlp_endpoint:
+            try:
+                post_otlp_json(args.otlp_endpoint, spans)
+            except httpx.HTTPError as e:
+                print(f"Span export to {args.otlp_endpoint} failed: {e}")
+
+    cache = ResponseCache(args.cache, max_entries=args.cache_size, ttl=args.cache_ttl) if args.cache else None
+
+    if args.batch:
+        os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = args.output or os.path.join(ARTIFACTS_DIR, f"batch_results_{timestamp}.jsonl")
+        timeline_file = os.path.splitext(output_file)[0] + "_throughput.csv"
+        limiter = AIMDLimiter(initial=args.concurrency, max_limit=args.max_concurrency) if args.adaptive else None
+        timeline = ThroughputTimeline(timeline_file, interval=args.report_interval)
+        mode = f"adaptive concurrency (start {args.concurrency}, max {args.max_concurrency})" if args.adaptive \
+            else f"concurrency {args.concurrency}"
+        print(f"Running batch from {args.batch} with {mode}, streaming results to {output_file}")
+        counts = run_batch(iter_prompts(args.batch), output_file, concurrency=args.concurrency,
+                           model=args.model, cache=cache, url=args.url, http2=args.http2, tracer=tracer,
+                           limiter=limiter, timeline=timeline)
+        timeline.close()
+        print(f"Throughput timeline saved to: {timeline_file}")
+        if limiter is not None:
+            print(f"Final concurrency limit {limiter.current} after {limiter.decreases} back-offs")
+        export_spans()
+        print(f"Batch finished: {counts['ok']} ok, {counts['failed']} failed")
+        if cache is not None:
+            print(f"Cache stats: {json.dumps(cache.stats())}")
+            cache.close()
+        sys.exit(1 if counts["failed"] else 0)
+
+    with open_http2_client() if args.http2 else contextlib.nullcontext() as session:
+        result = send_agent_team_request(args.prompt, model=args.model, cache=cache, url=args.url, session=session,
+                                         tracer=tracer)
+    export_spans()
+    if cache is not None:
+        print(f"Cache stats: {json.dumps(cache.stats())}")
+        cache.close()
     if result:
         print("\n--- Response ---\n")
         print(result['choices'][0]['message']['content'])
         
         # Save to artifacts directory in the repo
-        output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".artifacts")
+        output_dir = ARTIFACTS_DIR
         os.makedirs(output_dir, exist_ok=True)
-        import datetime
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         output_file = os.path.join(output_dir, f"execution_results_{timestamp}.json")
         
@@ -0,0 +1,97 @@
+import random
+
+from adaptive_concurrency import AIMDLimiter
+
+SERVICE_S = 0.1
+CAPACITY = 8
+
+
+def queueing(service_s):
+    # Requests beyond CAPACITY wait their turn: latency grows linearly with the limit
+    return lambda limit: service_s * max(1.0, limit / CAPACITY)
+
+
+def run_windows(limiter, model, windows, rng):
+    # One full decision window per step, every request run at the current limit
+    limits = []
+    for _ in range(windows):
+        epoch = limiter.start()
+        limit = limiter.current
+        for _ in range(max(limiter.min_window, limit)):
+            limiter.on_success(epoch, model(limit) * rng.uniform(0.95, 1.05))
+        limits.append(limiter.current)
+    return limits
+
+
+def test_overload_backs_off_once_per_epoch():
+    limiter = AIMDLimiter(initial=20)
+    stale = limiter.start()
+    limiter.on_overload(stale)
+    assert limiter.current == 14 and limiter.decreases == 1
+    # Requests started before the cut must not cut again
+    limiter.on_overload(stale)
+    assert limiter.current == 14 and limiter.decreases == 1
+    limiter.on_overload(limiter.start())
+    assert limiter.current == 9 and limiter.decreases == 2
+
+
+def test_backoff_stops_at_min_limit():
+    limiter = AIMDLimiter(initial=2, min_limit=1)
+    for _ in range(5):
+        limiter.on_overload(limiter.start())
+    assert limiter.current == 1
+
+
+def test_flat_latency_grows_one_per_window_to_max():
+    limiter = AIMDLimiter(initial=4, max_limit=10)
+    limits = run_windows(limiter, lambda limit: SERVICE_S, 10, random.Random(0))
+    assert limits[:6] == [5, 6, 7, 8, 9, 10]
+    assert limits[-1] == 10 and limiter.decreases == 0
+
+
+def test_no_decision_before_a_full_window():
+    limiter = AIMDLimiter(initial=4, min_window=10)
+    for _ in range(9):
+        limiter.on_success(limiter.start(), SERVICE_S)
+    assert limiter.current == 4 and limiter.baseline_p95 is None
+
+
+def test_latency_past_tolerance_backs_off():
+    limiter = AIMDLimiter(initial=10, tolerance=2.0)
+    run_windows(limiter, lambda limit: SERVICE_S, 1, random.Random(0))
+    assert limiter.current == 11
+    run_windows(limiter, lambda limit: SERVICE_S * 2.5, 1, random.Random(0))
+    assert limiter.current == 7 and limiter.decreases == 1
+
+
+def test_queueing_does_not_ratchet_the_baseline():
+    # p95 reaches tolerance x the service time at 2 x CAPACITY. Slower windows at
+    # higher limits are queueing and must not raise the baseline, or the limit
+    # would creep upward without bound.
+    limiter = AIMDLimiter(initial=4, max_limit=64)
+    limits = run_windows(limiter, queueing(SERVICE_S), 400, random.Random(1))
+    assert max(limits[-200:]) <= 2 * CAPACITY + 1
+    assert min(limits[-200:]) >= CAPACITY
+    assert limiter.baseline_p95 < SERVICE_S * 1.1
+
+
+def test_baseline_drops_to_a_faster_window():
+    limiter = AIMDLimiter(initial=4)
+    run_windows(limiter, lambda limit: SERVICE_S, 3, random.Random(2))
+    run_windows(limiter, lambda limit: SERVICE_S / 2, 1, random.Random(2))
+    assert limiter.baseline_p95 < SERVICE_S * 0.6
+    assert limiter.baseline_limit == 7
+
+
+def test_recovers_after_the_service_slows_down():
+    # A permanent 3x slowdown first reads as congestion; once the limit is back
+    # at the baseline's limit the baseline follows the new service time and the
+    # limit climbs again instead of sitting at the floor
+    rng = random.Random(3)
+    limiter = AIMDLimiter(initial=4, max_limit=64)
+    run_windows(limiter, queueing(SERVICE_S), 100, rng)
+    limits = run_windows(limiter, queueing(SERVICE_S * 3), 300, rng)
+    assert min(limits[-100:]) >= CAPACITY / 2
+    assert max(limits[-100:]) >= CAPACITY
+    assert max(limits[-100:]) <= 2 * CAPACITY + 1
+    assert SERVICE_S * 2 < limiter.baseline_p95 <= SERVICE_S * 3 * 1.05
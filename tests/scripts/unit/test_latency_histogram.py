@@ -0,0 +1,109 @@
+import json
+import math
+import random
+
+from latency_histogram import SUB_BUCKET_BITS, SUB_BUCKET_COUNT, LatencyHistogram, _bucket_index, _bucket_midpoint
+
+# Half-width of the widest linear bucket relative to its values
+MAX_RELATIVE_ERROR = 2.0 ** -(SUB_BUCKET_BITS - 1)
+
+
+def exact_percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(pct / 100.0 * len(ordered))) - 1]
+
+
+def sample(rng, n=20000):
+    # Lognormal latencies from about 1 ms to a few minutes
+    return [rng.lognormvariate(-1.0, 1.5) for _ in range(n)]
+
+
+def test_small_values_are_exact():
+    for value in range(SUB_BUCKET_COUNT):
+        assert _bucket_midpoint(_bucket_index(value)) == value
+
+
+def test_bucket_midpoint_round_trips():
+    rng = random.Random(1)
+    for _ in range(20000):
+        value = rng.randrange(SUB_BUCKET_COUNT, 10 ** 12)
+        index = _bucket_index(value)
+        midpoint = _bucket_midpoint(index)
+        assert _bucket_index(midpoint) == index
+        assert abs(midpoint - value) <= value * MAX_RELATIVE_ERROR
+
+
+def test_bucket_indexes_are_ordered():
+    values = [0, 1, SUB_BUCKET_COUNT - 1, SUB_BUCKET_COUNT, SUB_BUCKET_COUNT + 1, 10 ** 6, 10 ** 9, 10 ** 12]
+    indexes = [_bucket_index(value) for value in values]
+    assert indexes == sorted(indexes)
+
+
+def test_percentiles_match_exact_within_bucket_error():
+    values = sample(random.Random(2))
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    for pct in (1, 25, 50, 90, 95, 99, 99.9):
+        exact = exact_percentile(values, pct)
+        # Values are stored in whole microseconds before bucketing
+        assert abs(histogram.percentile(pct) - exact) <= exact * MAX_RELATIVE_ERROR + 1e-6, pct
+    assert histogram.percentile(100) == max(values)
+    assert histogram.total == len(values)
+    assert math.isclose(histogram.mean(), sum(values) / len(values))
+
+
+def test_percentiles_stay_within_min_and_max():
+    histogram = LatencyHistogram()
+    histogram.record(0.0123456)
+    for pct in (0, 50, 99, 100):
+        assert histogram.percentile(pct) == 0.0123456
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(99) == 0.0
+    assert histogram.mean() == 0.0
+
+
+def test_record_with_count():
+    repeated, single = LatencyHistogram(), LatencyHistogram()
+    repeated.record(0.25, count=3)
+    for _ in range(3):
+        single.record(0.25)
+    assert repeated.to_dict() == single.to_dict()
+
+
+def test_merge_equals_recording_everything_once():
+    rng = random.Random(3)
+    parts = [sample(rng, 5000) for _ in range(4)]
+    merged, combined = LatencyHistogram(), LatencyHistogram()
+    for values in parts:
+        part = LatencyHistogram()
+        for value in values:
+            part.record(value)
+            combined.record(value)
+        merged.merge(part)
+    assert merged.counts == combined.counts
+    assert (merged.total, merged.min, merged.max) == (combined.total, combined.min, combined.max)
+    assert math.isclose(merged.sum, combined.sum)
+    for pct in (50, 90, 99):
+        assert merged.percentile(pct) == combined.percentile(pct)
+
+
+def test_merge_into_empty_and_with_empty():
+    histogram = LatencyHistogram()
+    histogram.record(1.5)
+    assert LatencyHistogram().merge(histogram).to_dict() == histogram.to_dict()
+    assert histogram.merge(LatencyHistogram()).percentile(50) == 1.5
+
+
+def test_dict_round_trip_through_json():
+    histogram = LatencyHistogram()
+    for value in sample(random.Random(4), 2000):
+        histogram.record(value)
+    restored = LatencyHistogram.from_dict(json.loads(json.dumps(histogram.to_dict())))
+    assert restored.counts == histogram.counts
+    assert restored.to_dict() == histogram.to_dict()
+    for pct in (50, 99, 100):
+        assert restored.percentile(pct) == histogram.percentile(pct)
@@ -0,0 +1,39 @@
+from response_cache import ResponseCache, cache_key
+
+URL = "http://localhost:8000/agent/api/v1beta/chat/completions"
+OTHER_URL = "http://replica-2:8000/agent/api/v1beta/chat/completions"
+MODEL = "minimax-m2.7:cloud"
+MESSAGES = [{"role": "user", "content": "What is   the status?"}]
+RESPONSE = {"choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}}]}
+
+
+def test_key_ignores_whitespace_and_trailing_slash():
+    spaced = [{"role": "User", "content": " What is the status? "}]
+    assert cache_key(URL, MODEL, MESSAGES) == cache_key(URL + "/", MODEL, spaced)
+
+
+def test_changed_url_misses():
+    cache = ResponseCache()
+    cache.put(URL, MODEL, MESSAGES, RESPONSE)
+    assert cache.get(OTHER_URL, MODEL, MESSAGES) is None
+    assert cache.get(URL, MODEL, MESSAGES) == RESPONSE
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_changed_url_misses_across_runs(tmp_path):
+    path = tmp_path / "response_cache.sqlite"
+    cache = ResponseCache(str(path))
+    cache.put(URL, MODEL, MESSAGES, RESPONSE)
+    cache.close()
+
+    reopened = ResponseCache(str(path))
+    assert reopened.get(OTHER_URL, MODEL, MESSAGES) is None
+    assert reopened.get(URL, MODEL, MESSAGES) == RESPONSE
+    reopened.close()
+
+
+def test_expired_entry_misses():
+    cache = ResponseCache(ttl=-1)
+    cache.put(URL, MODEL, MESSAGES, RESPONSE)
+    assert cache.get(URL, MODEL, MESSAGES) is None
+    assert cache.stats()["expired"] == 1
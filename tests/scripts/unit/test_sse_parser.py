@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from sse_parser import DONE, SSEParser, iter_sse_events
+
+
+def chunk(delta, finish_reason=None, finish_first=False):
+    choice = {"finish_reason": finish_reason, "delta": delta, "index": 0} if finish_first \
+        else {"delta": delta, "index": 0, "finish_reason": finish_reason}
+    return f"data: {json.dumps({'object': 'chat.completion.chunk', 'choices': [choice]}, ensure_ascii=False)}\n\n"
+
+
+STREAM = (
+    chunk({"role": "assistant"})
+    + ": keep-alive\n\n"
+    + chunk({"content": "<think>[planner] plan</think>\n", "reasoning_content": "[planner] plan\n"})
+    + chunk({"content": "Grüße, "})
+    + chunk({"content": "naïve \"quoted\" TERMINATE"}, "stop")
+    + "data: [DONE]\n\n"
+).encode("utf-8")
+EXPECTED = [
+    ({"role": "assistant"}, None),
+    ({"content": "<think>[planner] plan</think>\n", "reasoning_content": "[planner] plan\n"}, None),
+    ({"content": "Grüße, "}, None),
+    ({"content": "naïve \"quoted\" TERMINATE"}, "stop"),
+    DONE,
+]
+
+
+def test_whole_stream():
+    assert SSEParser().feed(STREAM) == EXPECTED
+
+
+def test_every_split_point():
+    # Includes splits inside "data:", inside the blank-line separator and
+    # between the bytes of a multi-byte UTF-8 character
+    for cut in range(1, len(STREAM)):
+        parser = SSEParser()
+        assert parser.feed(STREAM[:cut]) + parser.feed(STREAM[cut:]) == EXPECTED, cut
+
+
+def test_byte_at_a_time():
+    assert list(iter_sse_events(STREAM[i:i + 1] for i in range(len(STREAM)))) == EXPECTED
+
+
+def test_crlf_line_endings():
+    crlf = STREAM.replace(b"\n\n", b"\r\n\r\n")
+    assert SSEParser().feed(crlf) == EXPECTED
+    for cut in range(1, len(crlf)):
+        parser = SSEParser()
+        assert parser.feed(crlf[:cut]) + parser.feed(crlf[cut:]) == EXPECTED, cut
+
+
+def test_multi_line_data_is_joined():
+    event = b'data: {"choices":[{"delta":\ndata: {"content":"two lines"},\ndata: "finish_reason":null}]}\n\n'
+    assert SSEParser().feed(event) == [({"content": "two lines"}, None)]
+
+
+def test_finish_reason_before_delta():
+    event = chunk({"content": "done"}, "stop", finish_first=True).encode()
+    assert SSEParser().feed(event) == [({"content": "done"}, "stop")]
+
+
+def test_keys_inside_content_are_not_fields():
+    event = chunk({"content": '"finish_reason": "x", "delta": {}'}).encode()
+    assert SSEParser().feed(event) == [({"content": '"finish_reason": "x", "delta": {}'}, None)]
+
+
+def test_chunk_without_delta():
+    assert SSEParser().feed(b'data: {"choices":[{"index":0,"finish_reason":"length"}]}\n\n') == [({}, "length")]
+
+
+def test_incomplete_event_is_held_back():
+    parser = SSEParser()
+    assert parser.feed(STREAM[:-2]) == EXPECTED[:-1]
+    assert parser.feed(b"\n\n") == [DONE]
+
+
+def test_non_json_data_raises_value_error():
+    # stream_completion turns this into an "invalid stream data" request error
+    with pytest.raises(ValueError):
+        SSEParser().feed(b"data: <html>502 Bad Gateway</html>\n\n")
@@ -0,0 +1,90 @@
+import asyncio
+import contextlib
+import threading
+
+import httpx
+
+from mock_completions import build_parser, make_server
+from streaming_client import stream_completion
+
+PAYLOAD = {"model": "mock", "messages": [{"role": "user", "content": "hi"}], "stream": True}
+
+
+@contextlib.contextmanager
+def mock_server(*flags):
+    server = make_server(build_parser().parse_args(["--port", "0", "--service-time", "0", "--token-interval", "0",
+                                                    *flags]))
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/agent/api/v1beta/chat/completions"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def complete(url, payload=PAYLOAD, **kwargs):
+    async def run():
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            return await stream_completion(client, url, payload, **kwargs)
+    return asyncio.run(run())
+
+
+def test_answer_stream():
+    with mock_server() as url:
+        result = complete(url, collect_content=True)
+    assert result["error"] is None
+    assert result["end_reason"] == "stop"
+    assert result["ttft"] >= result["ttfb"]
+    assert "".join(result["content"]).endswith("Hello world TERMINATE")
+    assert result["request_bytes"] > len(b'{"model":"mock"}') and result["response_bytes"] > 0
+
+
+def test_stream_end_found_without_parsing():
+    # Without a consumer for later events parsing stops at the first answer token
+    with mock_server() as url:
+        result = complete(url)
+    assert result["error"] is None and result["end_reason"] == "done"
+
+
+def test_lone_done_is_an_empty_stream():
+    # route_query's answer when run_stream fails to start
+    with mock_server("--mode", "done-only") as url:
+        result = complete(url)
+    assert result["status_code"] == 200
+    assert result["error"] == "empty stream"
+
+
+def test_eof_before_done_is_a_truncated_stream():
+    with mock_server("--mode", "truncated") as url:
+        assert complete(url)["error"] == "truncated stream"
+        assert complete(url, collect_content=True)["error"] == "truncated stream"
+
+
+def test_early_close_is_not_truncated():
+    with mock_server("--trailing-time", "2") as url:
+        result = complete(url, early_close=True)
+    assert result["error"] is None and result["end_reason"] == "early"
+
+
+def test_malformed_data_fails_the_request():
+    with mock_server("--malformed-rate", "1") as url:
+        assert complete(url, collect_content=True)["error"] == "invalid stream data"
+
+
+def test_request_size_recorded_when_headers_time_out():
+    async def run(url):
+        async with httpx.AsyncClient(timeout=0.2) as client:
+            return await stream_completion(client, url, PAYLOAD)
+
+    with mock_server("--header-delay", "1") as url:
+        result = asyncio.run(run(url))
+    assert result["error"] == "timeout"
+    assert result["request_bytes"] > 0
+
+
+def test_non_streaming_response():
+    with mock_server() as url:
+        result = complete(url, {**PAYLOAD, "stream": False}, collect_content=True)
+    assert result["error"] is None
+    assert result["content"] == ["Hello world TERMINATE"]
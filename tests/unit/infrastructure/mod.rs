@@ -2,3 +2,4 @@ pub mod confluence_test;
 pub mod jira_test;
 pub mod r2r_test;
 pub mod search_test;
+pub mod telemetry_test;
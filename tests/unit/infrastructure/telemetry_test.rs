@@ -0,0 +1,34 @@
+use axum::{body::Body, http::Request};
+use opentelemetry::{
+    global,
+    trace::{TraceContextExt, TraceId, TracerProvider as _},
+};
+use opentelemetry_sdk::{propagation::TraceContextPropagator, trace::TracerProvider};
+use rust_agent_team::infrastructure::telemetry::make_request_span;
+use tracing_opentelemetry::OpenTelemetrySpanExt;
+use tracing_subscriber::layer::SubscriberExt;
+
+#[test]
+fn test_request_span_continues_incoming_trace() {
+    global::set_text_map_propagator(TraceContextPropagator::new());
+    let provider = TracerProvider::builder().build();
+    let subscriber = tracing_subscriber::registry()
+        .with(tracing_opentelemetry::layer().with_tracer(provider.tracer("test")));
+
+    tracing::subscriber::with_default(subscriber, || {
+        let request = Request::builder()
+            .uri("/agent/api/v1beta/chat/completions")
+            .header(
+                "traceparent",
+                "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01",
+            )
+            .body(Body::empty())
+            .unwrap();
+
+        let span = make_request_span(&request);
+        assert_eq!(
+            span.context().span().span_context().trace_id(),
+            TraceId::from_hex("4bf92f3577b34da6a3ce929d0e0e4736").unwrap()
+        );
+    });
+}